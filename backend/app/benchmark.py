@@ -0,0 +1,147 @@
+# backend/app/benchmark.py
+"""Load benchmark for the hot endpoints: find-matches, the dashboard donor list, stats and login.
+
+    python -m app.benchmark --seed-donors 1000000 --concurrency 1 8 32 --duration 20 --output bench.json
+
+Each endpoint is driven at each concurrency level by that many closed-loop clients (send, wait for
+the response, send again) for `--duration` seconds after a `--warmup`, and reported as throughput
+and p50/p90/p99 latency. By default the app runs in-process through httpx's ASGI transport, so no
+server is needed (client and server then share one event loop); `--base-url` targets a running
+server instead, e.g. gunicorn. `--seed-donors` first adds that many donors with `seed.py` (same
+`--seed`, so runs at the same scale see the same data). Results are written as JSON; `--compare`
+prints the change against an earlier result file and exits non-zero when any p99 regressed by more
+than `--threshold`.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import subprocess
+import numpy as np
+import httpx
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+from sqlalchemy import func, select
+try:
+    from . import models, seed
+except ImportError:
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    import models, seed
+
+LOGIN = {"username": seed.YENEPOYA_EMAIL, "password": "yenepoya123"}
+
+# name -> (method, path, request kwargs, needs a bearer token)
+ENDPOINTS: Dict[str, Any] = {
+    "find_matches": ("POST", "/dashboard/find-matches", {"json": {"blood_type_needed": "O+", "limit": 50}}, True),
+    "find_matches_network": ("POST", "/dashboard/find-matches", {"json": {"blood_type_needed": "O+", "scope": "network", "radius_km": 300}}, True),
+    "dashboard_donors": ("GET", "/dashboard/donors", {"params": {"limit": 100}}, True),
+    "dashboard_stats": ("GET", "/hospitals/dashboard/stats", {}, True),
+    "login": ("POST", "/token", {"data": LOGIN}, False),
+}
+DEFAULT_ENDPOINTS = ["find_matches", "dashboard_donors", "dashboard_stats", "login"]
+
+def summarize(latencies: Sequence[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    ms = np.asarray(latencies) * 1000
+    stats = {"requests": len(ms), "errors": errors, "throughput_rps": round(len(ms) / elapsed, 2) if elapsed else 0.0}
+    if len(ms):
+        p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+        stats.update(p50_ms=round(p50, 3), p90_ms=round(p90, 3), p99_ms=round(p99, 3), mean_ms=round(float(ms.mean()), 3), max_ms=round(float(ms.max()), 3))
+    return stats
+
+async def run_load(client: httpx.AsyncClient, method: str, path: str, kwargs: Dict[str, Any], concurrency: int, duration: float, warmup: float) -> Dict[str, Any]:
+    """`concurrency` closed-loop clients; only requests started after the warmup are measured."""
+    latencies: List[float] = []; errors = 0
+    loop = asyncio.get_running_loop()
+    measure_from = loop.time() + warmup; stop_at = measure_from + duration
+    async def worker():
+        nonlocal errors
+        while (started := loop.time()) < stop_at:
+            try:
+                response = await client.request(method, path, **kwargs); await response.aread()
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            if started >= measure_from:
+                if ok: latencies.append(loop.time() - started)
+                else: errors += 1
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, duration)
+
+async def run_benchmark(client: httpx.AsyncClient, endpoints: Sequence[str], concurrency: Sequence[int], duration: float, warmup: float) -> List[Dict[str, Any]]:
+    response = await client.post("/token", data=LOGIN); response.raise_for_status()
+    auth = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    results = []
+    for name in endpoints:
+        method, path, kwargs, needs_auth = ENDPOINTS[name]
+        kwargs = {**kwargs, "headers": auth} if needs_auth else kwargs
+        for level in concurrency:
+            stats = await run_load(client, method, path, kwargs, level, duration, warmup)
+            results.append({"endpoint": name, "method": method, "path": path, "concurrency": level, **stats})
+            print(f"{name:<22} c={level:<4} {stats['throughput_rps']:>9.1f} req/s  p50 {stats.get('p50_ms', float('nan')):>9.2f} ms  p99 {stats.get('p99_ms', float('nan')):>9.2f} ms  errors {stats['errors']}", file=sys.stderr)
+    return results
+
+async def run_in_process(args) -> List[Dict[str, Any]]:
+    try: from .main import app
+    except ImportError: from main import app
+    limits = httpx.Limits(max_connections=None)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app, raise_app_exceptions=False), base_url="http://benchmark", limits=limits, timeout=args.timeout) as client:
+            return await run_benchmark(client, args.endpoints, args.concurrency, args.duration, args.warmup)
+
+async def run_remote(args) -> List[Dict[str, Any]]:
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        return await run_benchmark(client, args.endpoints, args.concurrency, args.duration, args.warmup)
+
+def environment(args) -> Dict[str, Any]:
+    try: commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError: commit = None
+    meta = { "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"), "git_commit": commit, "python": platform.python_version(), "cpu_count": os.cpu_count(), "target": args.base_url or "in-process", "duration_s": args.duration, "warmup_s": args.warmup, "seed": args.seed, }
+    if not args.base_url:
+        with models.SessionLocal() as db:
+            meta.update(database=models.engine.dialect.name, hospitals=db.scalar(select(func.count(models.Hospital.id))), donors=db.scalar(select(func.count(models.Donor.id))))
+    return meta
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, threshold: float) -> bool:
+    """Prints the p50/p99 and throughput change per row present in both runs; True when no p99 regressed beyond `threshold`."""
+    with open(baseline_path, encoding="utf-8") as f: baseline = {(r["endpoint"], r["concurrency"]): r for r in json.load(f)["results"]}
+    ok = True
+    for row in results:
+        base = baseline.get((row["endpoint"], row["concurrency"]))
+        if base is None or "p99_ms" not in row or "p99_ms" not in base: continue
+        change = {k: (row[k] - base[k]) / base[k] if base[k] else 0.0 for k in ("p50_ms", "p99_ms", "throughput_rps")}
+        regressed = change["p99_ms"] > threshold; ok = ok and not regressed
+        print(f"{row['endpoint']:<22} c={row['concurrency']:<4} p50 {change['p50_ms']:+.1%}  p99 {change['p99_ms']:+.1%}  throughput {change['throughput_rps']:+.1%}{'  REGRESSED' if regressed else ''}", file=sys.stderr)
+    return ok
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the API's hot endpoints at a configurable scale and concurrency.")
+    parser.add_argument("--base-url", default=None, help="benchmark a running server instead of the app in-process")
+    parser.add_argument("--endpoints", nargs="+", choices=list(ENDPOINTS), default=DEFAULT_ENDPOINTS)
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8, 32], help="concurrent clients; one run per value (default: %(default)s)")
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds per run (default: %(default)s)")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds before each run (default: %(default)s)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout in seconds (default: %(default)s)")
+    parser.add_argument("--seed-donors", type=int, default=0, help="add this many synthetic donors before benchmarking")
+    parser.add_argument("--hospitals", type=int, default=1 + seed.NUM_OTHER_HOSPITALS, help="hospitals used by --seed-donors (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=seed.DEFAULT_SEED, help="random seed for --seed-donors (default: %(default)s)")
+    parser.add_argument("--output", default=None, help="write the JSON results here (default: stdout)")
+    parser.add_argument("--compare", default=None, help="an earlier --output file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative p99 increase with --compare (default: %(default)s)")
+    args = parser.parse_args(argv)
+    if args.seed_donors: seed.seed_database(args.seed_donors, args.hospitals, args.seed)
+    started = time.perf_counter()
+    results = asyncio.run(run_remote(args) if args.base_url else run_in_process(args))
+    report = {"meta": {**environment(args), "wall_time_s": round(time.perf_counter() - started, 1)}, "results": results}
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f: f.write(payload + "\n")
+    else:
+        print(payload)
+    if args.compare and not compare(results, args.compare, args.threshold): sys.exit(1)
+
+if __name__ == "__main__":
+    main()
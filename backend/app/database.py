@@ -0,0 +1,51 @@
+# backend/app/database.py
+"""Request-scoped database handles shared by the sync and async (DB_ASYNC) modes.
+
+Endpoints are `async def` and hand their query code, written against a plain `Session`, to
+`await db.run(fn, *args)`. In sync mode `fn` runs in the threadpool on a `SessionLocal` session;
+in async mode it runs through `AsyncSession.run_sync` on the asyncio engine (asyncpg/aiosqlite),
+so waiting on the database never holds a worker thread. `run_sync` calls `fn` on the event-loop
+thread, though, so `fn` should only query: CPU work on its results (scoring, building response
+rows, validating input) goes to `run_in_threadpool` before or after it, which is where it ran in
+sync mode anyway.
+"""
+from typing import Any, AsyncIterator, Callable, TypeVar
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+try:
+    from . import models
+except ImportError:
+    import sys
+    import os
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    import models
+
+T = TypeVar("T")
+
+class Database:
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Calls `fn(session, *args, **kwargs)` without blocking the event loop."""
+        raise NotImplementedError
+    async def close(self) -> None:
+        raise NotImplementedError
+
+class ThreadpoolDatabase(Database):
+    def __init__(self, session: Session): self.session = session
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+    async def close(self) -> None:
+        await run_in_threadpool(self.session.close)
+
+class AsyncDatabase(Database):
+    def __init__(self, session): self.session = session
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        return await self.session.run_sync(fn, *args, **kwargs)
+    async def close(self) -> None:
+        await self.session.close()
+
+async def get_db() -> AsyncIterator[Database]:
+    db = AsyncDatabase(models.AsyncSessionLocal()) if models.DB_ASYNC else ThreadpoolDatabase(models.SessionLocal())
+    try:
+        yield db
+    finally:
+        await db.close()
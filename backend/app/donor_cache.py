@@ -0,0 +1,252 @@
+# backend/app/donor_cache.py
+"""Process-local, per-hospital caches of donor data.
+
+`donor_pools` holds each hospital's donors column-wise, loaded with a single column query ordered
+by `full_name` and indexed by blood type; find-matches and the dashboard donor list read from it.
+`network_pools` holds only each hospital's active donors, for network-wide search; it is bounded
+separately (NETWORK_CACHE_MAX_HOSPITALS) so a scan over every hospital never evicts the
+`donor_pools` entries that hospital-scope matching relies on. `donor_counts` optionally keeps the
+dashboard stats as counters per (blood type, status) (STATS_COUNTERS_ENABLED, off by default:
+with several workers, stats read right after a write served by another worker would be stale, so
+by default every stats request runs the one grouped COUNT query). Writes made by this process go
+through `record_new_donor`, `record_status_change` and `record_batch_status_change`, which patch or
+invalidate the caches. Other worker processes pick up changes when their copy expires after
+DONOR_CACHE_TTL_SECONDS. At most DONOR_CACHE_MAX_HOSPITALS entries are kept per cache, evicting the
+least recently used one.
+"""
+import os
+import enum
+import threading
+import time
+import numpy as np
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Generic, List, Optional, Sequence, Tuple, TypeVar
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+try:
+    from . import metrics, models, ranking
+except ImportError:
+    import sys
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    import metrics, models, ranking
+
+DONOR_CACHE_ENABLED = os.getenv("DONOR_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+DONOR_CACHE_TTL_SECONDS = float(os.getenv("DONOR_CACHE_TTL_SECONDS", "30"))
+DONOR_CACHE_MAX_HOSPITALS = int(os.getenv("DONOR_CACHE_MAX_HOSPITALS", "128"))
+NETWORK_CACHE_MAX_HOSPITALS = int(os.getenv("NETWORK_CACHE_MAX_HOSPITALS", "1024"))
+STATS_COUNTERS_ENABLED = os.getenv("STATS_COUNTERS_ENABLED", "false").lower() in ("1", "true", "yes")
+
+T = TypeVar("T")
+
+_COLUMNS = ( models.Donor.id, models.Donor.full_name, models.Donor.email, models.Donor.phone, models.Donor.blood_type, models.Donor.location, models.Donor.city, models.Donor.latitude, models.Donor.longitude, models.Donor.last_donation_date, models.Donor.reliability_score, models.Donor.fatigue_level, models.Donor.status, models.Donor.updated_at, )
+
+def _value(member: Any) -> Any:
+    # Columns hold plain enum values: NumPy compares str-based enum members by their str(), not their value.
+    return member.value if isinstance(member, enum.Enum) else member
+
+def listing_etag(hospital_id: int, count: int, last_updated: Optional[Any]) -> str:
+    """Validator for a hospital's full donor listing: donors are never deleted and every change bumps `updated_at`."""
+    stamp = int(np.datetime64(last_updated, "us").astype(np.int64)) if last_updated is not None else 0
+    return f'W/"donors-{hospital_id}-{count}-{stamp}"'
+
+@dataclass
+class DonorPool:
+    """One hospital's donors as aligned columns, in `full_name` order."""
+    hospital_id: int
+    ids: np.ndarray
+    full_names: List[str]
+    emails: List[str]
+    phones: List[str]
+    blood_types: np.ndarray
+    locations: List[str]
+    cities: np.ndarray
+    latitudes: np.ndarray
+    longitudes: np.ndarray
+    last_donation: np.ndarray
+    reliability: np.ndarray
+    fatigue: np.ndarray
+    statuses: np.ndarray
+    updated_at: np.ndarray
+    by_blood_type: Dict[str, np.ndarray] = field(init=False)
+    _id_order: np.ndarray = field(init=False)
+
+    def __post_init__(self):
+        self.by_blood_type = {bt.value: np.flatnonzero(self.blood_types == bt.value) for bt in models.BloodType}
+        self._id_order = np.argsort(self.ids, kind="stable")
+
+    def __len__(self) -> int: return len(self.ids)
+
+    @classmethod
+    def load(cls, db: Session, hospital_id: int) -> "DonorPool":
+        with metrics.span("db_fetch"):
+            rows = db.execute(select(*_COLUMNS).where(models.Donor.hospital_id == hospital_id).order_by(models.Donor.full_name)).all()
+        with metrics.span("hydration"): return cls._from_rows(hospital_id, rows)
+
+    @classmethod
+    def load_active(cls, db: Session, hospital_id: int) -> "DonorPool":
+        """Only the active donors, in id order (which, unlike `full_name`, lets the status index drive the query)."""
+        Donor = models.Donor
+        with metrics.span("db_fetch"):
+            rows = db.execute(select(*_COLUMNS).where(Donor.hospital_id == hospital_id, Donor.status == models.DonorStatus.ACTIVE).order_by(Donor.id)).all()
+        with metrics.span("hydration"): return cls._from_rows(hospital_id, rows)
+
+    @classmethod
+    def _from_rows(cls, hospital_id: int, rows: Sequence[Any]) -> "DonorPool":
+        columns = list(zip(*rows)) if rows else [()] * len(_COLUMNS)
+        ids, names, emails, phones, blood_types, locations, cities, latitudes, longitudes, last_donation, reliability, fatigue, statuses, updated_at = columns
+        return cls(
+            hospital_id=hospital_id, ids=np.array(ids, dtype=np.int64), full_names=list(names), emails=list(emails), phones=list(phones),
+            blood_types=np.array([_value(bt) for bt in blood_types], dtype=object), locations=list(locations), cities=np.array(cities, dtype=object),
+            latitudes=np.array(latitudes, dtype=float), longitudes=np.array(longitudes, dtype=float),
+            last_donation=np.array(last_donation, dtype="datetime64[us]"), reliability=np.array(reliability, dtype=float),
+            fatigue=np.array(fatigue, dtype=float), statuses=np.array([_value(st) for st in statuses], dtype=object),
+            updated_at=np.array(updated_at, dtype="datetime64[us]"),
+        )
+
+    def position(self, donor_id: int) -> Optional[int]:
+        i = np.searchsorted(self.ids, donor_id, sorter=self._id_order)
+        if i < len(self.ids) and self.ids[self._id_order[i]] == donor_id: return int(self._id_order[i])
+        return None
+
+    def row(self, i: int) -> Dict[str, Any]:
+        """Materializes one donor in the shape (and field order) of `schemas.Donor`."""
+        last_donation = self.last_donation[i]
+        return {
+            "full_name": self.full_names[i], "email": self.emails[i], "phone": self.phones[i], "blood_type": self.blood_types[i], "location": self.locations[i],
+            "id": int(self.ids[i]), "hospital_id": self.hospital_id, "status": self.statuses[i],
+            "reliability_score": None if np.isnan(self.reliability[i]) else float(self.reliability[i]),
+            "last_donation_date": None if np.isnat(last_donation) else last_donation.astype(object),
+            "fatigue_level": None if np.isnan(self.fatigue[i]) else float(self.fatigue[i]),
+            "updated_at": None if np.isnat(self.updated_at[i]) else self.updated_at[i].astype(object),
+        }
+
+    def etag(self) -> str:
+        return listing_etag(self.hospital_id, len(self), self.updated_at.max().astype(object) if len(self) else None)
+
+    def select(self, blood_types: Sequence[str], status: models.DonorStatus) -> np.ndarray:
+        """Row positions with one of `blood_types` and the given status, in pool order."""
+        parts = [self.by_blood_type[bt] for bt in blood_types if bt in self.by_blood_type]
+        rows = np.sort(np.concatenate(parts)) if parts else np.array([], dtype=np.int64)
+        return rows[self.statuses[rows] == _value(status)]
+
+    def features(self, blood_types: Sequence[str], hospital_location: str, radius_km: Optional[float] = None) -> ranking.DonorFeatures:
+        rows = self.select(blood_types, models.DonorStatus.ACTIVE)
+        return ranking.build_features(_PoolRows(self), rows, self.reliability[rows], self.fatigue[rows], self.last_donation[rows], self.cities[rows], self.latitudes[rows], self.longitudes[rows], self.blood_types[rows], ranking.Origin.at(hospital_location), radius_km)
+
+class _PoolRows:
+    """Sequence view over a pool that builds donor rows only when indexed."""
+    def __init__(self, pool: DonorPool): self.pool = pool
+    def __len__(self) -> int: return len(self.pool)
+    def __getitem__(self, i) -> Dict[str, Any]: return self.pool.row(int(i))
+
+@dataclass
+class DonorCounts:
+    """Donor counts of one hospital per (blood type, status) value pair."""
+    counts: Dict[Tuple[str, str], int]
+
+    @classmethod
+    def load(cls, db: Session, hospital_id: int) -> "DonorCounts":
+        rows = db.execute(select(models.Donor.blood_type, models.Donor.status, func.count(models.Donor.id)).where(models.Donor.hospital_id == hospital_id).group_by(models.Donor.blood_type, models.Donor.status)).all()
+        return cls(counts={(_value(bt), _value(st)): n for bt, st, n in rows})
+
+    def add(self, blood_type: Any, status: Any, delta: int = 1) -> None:
+        key = (_value(blood_type), _value(status))
+        self.counts[key] = self.counts.get(key, 0) + delta
+
+    def summary(self, breakdown: bool = False) -> Dict[str, Any]:
+        counts = dict(self.counts)
+        by_status = {st.value: sum(n for (_, s), n in counts.items() if s == st.value) for st in models.DonorStatus}
+        result: Dict[str, Any] = { "total_donors": sum(counts.values()), "active_donors": by_status[models.DonorStatus.ACTIVE.value], "pending_donors": by_status[models.DonorStatus.PENDING_APPROVAL.value], }
+        if breakdown:
+            result["by_blood_type"] = { bt.value: {st.value: counts.get((bt.value, st.value), 0) for st in models.DonorStatus} for bt in models.BloodType }
+        return result
+
+class HospitalCache(Generic[T]):
+    """LRU of per-hospital entries with a TTL. A generation counter per hospital, bumped by every
+    write, keeps a load that raced a write from being cached."""
+    def __init__(self, name: str, loader: Callable[[Session, int], T], enabled: bool = True, max_hospitals: int = DONOR_CACHE_MAX_HOSPITALS, ttl_seconds: float = DONOR_CACHE_TTL_SECONDS):
+        self.name = name; self.loader = loader; self.enabled = enabled; self.max_hospitals = max_hospitals; self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[int, Tuple[T, float]]" = OrderedDict()
+        self._generations: Dict[int, int] = {}
+        self._epoch = 0  # bumped by a full invalidation
+        self._lock = threading.Lock()
+        self.hits = 0; self.misses = 0; self.evictions = 0; self.invalidations = 0
+
+    def get(self, db: Session, hospital_id: int) -> T:
+        if not self.enabled: return self.loader(db, hospital_id)
+        with self._lock:
+            entry = self._entries.get(hospital_id)
+            if entry is not None and time.monotonic() - entry[1] < self.ttl_seconds:
+                self._entries.move_to_end(hospital_id); self.hits += 1
+                metrics.record_cache_lookup(self.name, True)
+                return entry[0]
+            self.misses += 1; generation = (self._epoch, self._generations.get(hospital_id, 0))
+        metrics.record_cache_lookup(self.name, False)
+        value = self.loader(db, hospital_id)
+        with self._lock:
+            if (self._epoch, self._generations.get(hospital_id, 0)) != generation: return value
+            self._entries[hospital_id] = (value, time.monotonic()); self._entries.move_to_end(hospital_id)
+            while len(self._entries) > self.max_hospitals:
+                self._entries.popitem(last=False); self.evictions += 1
+        return value
+
+    def invalidate(self, hospital_id: Optional[int] = None) -> None:
+        with self._lock:
+            if hospital_id is None:
+                self._entries.clear(); self._epoch += 1
+            else:
+                self._entries.pop(hospital_id, None); self._bump(hospital_id)
+            self.invalidations += 1
+
+    def patch(self, hospital_id: int, update: Callable[[T], bool]) -> None:
+        """Write-through: applies `update` to the cached entry, if any; the entry is dropped when `update` returns False."""
+        with self._lock:
+            self._bump(hospital_id)
+            entry = self._entries.get(hospital_id)
+            if entry is not None and not update(entry[0]):
+                del self._entries[hospital_id]; self.invalidations += 1
+
+    def _bump(self, hospital_id: int) -> None:
+        self._generations[hospital_id] = self._generations.get(hospital_id, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return { "enabled": self.enabled, "hospitals": len(self._entries), "hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0, "evictions": self.evictions, "invalidations": self.invalidations, }
+
+donor_pools: HospitalCache[DonorPool] = HospitalCache("donor_pools", DonorPool.load, enabled=DONOR_CACHE_ENABLED)
+donor_counts: HospitalCache[DonorCounts] = HospitalCache("donor_counts", DonorCounts.load, enabled=STATS_COUNTERS_ENABLED)
+network_pools: HospitalCache[DonorPool] = HospitalCache("network_pools", DonorPool.load_active, enabled=DONOR_CACHE_ENABLED, max_hospitals=NETWORK_CACHE_MAX_HOSPITALS)
+
+def _set_pool_status(pool: DonorPool, donor_id: int, status: Any, updated_at: Any) -> bool:
+    i = pool.position(donor_id)
+    if i is None: return False
+    pool.statuses[i] = _value(status); pool.updated_at[i] = np.datetime64(updated_at, "us")
+    return True
+
+def record_new_donor(hospital_id: int, blood_type: Any, status: Any) -> None:
+    # A new row's place in the full_name order is only known to the database, so the pool is reloaded.
+    donor_pools.invalidate(hospital_id)
+    if _value(status) == models.DonorStatus.ACTIVE.value: network_pools.invalidate(hospital_id)
+    donor_counts.patch(hospital_id, lambda counts: counts.add(blood_type, status) or True)
+
+def record_status_change(hospital_id: int, donor_id: int, blood_type: Any, old_status: Any, new_status: Any, updated_at: Any) -> None:
+    donor_pools.patch(hospital_id, lambda pool: _set_pool_status(pool, donor_id, new_status, updated_at))
+    # Network pools hold active donors only, so a change into or out of ACTIVE changes their membership.
+    if models.DonorStatus.ACTIVE.value in (_value(old_status), _value(new_status)): network_pools.invalidate(hospital_id)
+    def move(counts: DonorCounts) -> bool:
+        counts.add(blood_type, old_status, -1); counts.add(blood_type, new_status)
+        return True
+    donor_counts.patch(hospital_id, move)
+
+def record_batch_status_change(hospital_id: int, donor_ids: Sequence[int], new_status: Any, updated_at: Any) -> None:
+    """`record_status_change` for donors set to `new_status` by one set-based UPDATE, whose previous statuses are
+    not known for certain (any of them may have changed since they were read), so the counters are reloaded."""
+    if not donor_ids: return
+    donor_pools.patch(hospital_id, lambda pool: all([_set_pool_status(pool, donor_id, new_status, updated_at) for donor_id in donor_ids]))
+    network_pools.invalidate(hospital_id)
+    donor_counts.invalidate(hospital_id)
+
+def cache_stats() -> Dict[str, Any]:
+    return { "donor_pools": donor_pools.stats(), "donor_counts": donor_counts.stats(), "network_pools": network_pools.stats(), }
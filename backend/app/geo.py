@@ -0,0 +1,60 @@
+# backend/app/geo.py
+"""Offline geocoding and distance helpers.
+
+Cities are resolved against `data/india_cities.csv`, a bundled gazetteer keyed by the normalized
+city name (see `models.normalize_city`). Distances use the equirectangular approximation around
+the origin's latitude: accurate to well under 1% at the few-hundred-km range that matters for
+donor matching, and plain arithmetic, so the SQL ranker can compute the same value on SQLite.
+Donors are bucketed into GRID_DEGREES x GRID_DEGREES cells (`geo_cell`) so radius queries can
+prefilter on an indexed `geo_cell` range before the exact distance check. Cells are numbered row by
+row, so the cells overlapping a radius' bounding box are one `geo_cell` range (whole rows) narrowed
+by a longitude band: a fixed handful of bound parameters however large the radius.
+"""
+import os
+import csv
+import math
+import numpy as np
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.pi / 180 * EARTH_RADIUS_KM
+GRID_DEGREES = 0.5
+PROXIMITY_RADIUS_KM = float(os.getenv("PROXIMITY_RADIUS_KM", "100"))
+GAZETTEER_PATH = os.getenv("GAZETTEER_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "india_cities.csv"))
+
+@lru_cache(maxsize=1)
+def gazetteer() -> Dict[str, Tuple[float, float]]:
+    with open(GAZETTEER_PATH, newline="", encoding="utf-8") as f:
+        return {row["city"].strip().lower(): (float(row["latitude"]), float(row["longitude"])) for row in csv.DictReader(f)}
+
+def geocode(city: Optional[str]) -> Optional[Tuple[float, float]]:
+    """(latitude, longitude) of a normalized city name, or None when it is not in the gazetteer."""
+    return gazetteer().get(city) if city else None
+
+def grid_cell(latitude: Optional[float], longitude: Optional[float]) -> Optional[int]:
+    if latitude is None or longitude is None: return None
+    return int(math.floor((latitude + 90) / GRID_DEGREES)) * 1000 + int(math.floor((longitude + 180) / GRID_DEGREES))
+
+def km_per_degree(origin_latitude: float) -> Tuple[float, float]:
+    """Kilometres per degree of (longitude, latitude) around `origin_latitude`."""
+    return KM_PER_DEGREE * math.cos(math.radians(origin_latitude)), KM_PER_DEGREE
+
+def squared_distance_km(origin_latitude: float, origin_longitude: float, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """Squared distances from the origin; NaN where a coordinate is missing."""
+    kx, ky = km_per_degree(origin_latitude)
+    dx = (longitudes - origin_longitude) * kx; dy = (latitudes - origin_latitude) * ky
+    return dx * dx + dy * dy
+
+def proximity(squared_km: np.ndarray, radius_km: float = PROXIMITY_RADIUS_KM) -> np.ndarray:
+    """1 at the origin falling smoothly to 0 at `radius_km` (1 - (d / r)^2, clipped at 0)."""
+    return np.clip(1 - squared_km / (radius_km * radius_km), 0, None)
+
+def cell_box(latitude: float, longitude: float, radius_km: float) -> Tuple[int, int, float, float]:
+    """(first cell, last cell, west, east) covering the grid cells that overlap the bounding box of a radius
+    around a point: the cells numbered first..last whose longitude lies in [west, east)."""
+    kx, ky = km_per_degree(latitude)
+    dlat = radius_km / ky; dlon = radius_km / max(kx, 1e-6)
+    lat_lo = int(math.floor((max(latitude - dlat, -90) + 90) / GRID_DEGREES)); lat_hi = int(math.floor((min(latitude + dlat, 90) + 90) / GRID_DEGREES))
+    lon_lo = int(math.floor((max(longitude - dlon, -180) + 180) / GRID_DEGREES)); lon_hi = int(math.floor((min(longitude + dlon, 180) + 180) / GRID_DEGREES))
+    return lat_lo * 1000 + lon_lo, lat_hi * 1000 + lon_hi, lon_lo * GRID_DEGREES - 180, (lon_hi + 1) * GRID_DEGREES - 180
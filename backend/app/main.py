@@ -1,9 +1,21 @@
 # backend/app/main.py
-from fastapi import FastAPI
+import os
+import time
+_import_started = time.perf_counter()
+import logging
+from contextlib import contextmanager
+from typing import Dict
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import text
 from .routers import auth, donors, hospitals
-from . import models
-import logging
+from . import metrics, models, ranking
+from .donor_cache import cache_stats
+
+# Per-phase startup durations in seconds. Under gunicorn's preload the import (and the master-side
+# schema check and lightgbm/shap imports) are paid once in the master, and workers inherit these entries.
+startup_timings: Dict[str, float] = {"import": time.perf_counter() - _import_started}
+SCHEMA_CHECK_ON_STARTUP = os.getenv("SCHEMA_CHECK_ON_STARTUP", "true").lower() in ("1", "true", "yes")
 
 app = FastAPI(
     title="Smart Blood Donor Platform API",
@@ -19,22 +31,68 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "Server-Timing"],
 )
+app.add_middleware(metrics.RequestMetricsMiddleware)
 
 logger = logging.getLogger("uvicorn.error")
 
+@contextmanager
+def startup_phase(name: str):
+    started = time.perf_counter()
+    try: yield
+    finally: startup_timings[name] = time.perf_counter() - started
+
+def startup_report() -> str:
+    return ", ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in startup_timings.items())
+
+async def _connect_database() -> None:
+    """Opens (and returns to the pool) this worker's first connection."""
+    if models.async_engine is not None:
+        async with models.async_engine.connect() as conn: await conn.execute(text("SELECT 1"))
+    else:
+        with models.engine.connect() as conn: conn.execute(text("SELECT 1"))
+
 @app.on_event("startup")
 async def on_startup():
+    if SCHEMA_CHECK_ON_STARTUP:
+        try:
+            with startup_phase("schema-check"): models.create_db_tables()
+            logger.info("Database tables ensured on startup.")
+        except Exception as e:
+            logger.exception("Failed to create/ensure database tables on startup: %s", e)
     try:
-        models.create_db_tables()
-        logger.info("Database tables ensured on startup.")
+        with startup_phase("db-connect"): await _connect_database()
     except Exception as e:
-        logger.exception("Failed to create/ensure database tables on startup: %s", e)
+        logger.exception("Database is not reachable on startup: %s", e)
+    # Load the ranking model now rather than on the first match request; in every worker (see model_registry).
+    with startup_phase("model-load"): model = ranking.registry.current()
+    logger.info("Ranking model: %s. Startup timings (pid %d): %s", model.name, os.getpid(), startup_report())
 
 app.include_router(auth.router)
 app.include_router(hospitals.router)
 app.include_router(donors.router)
 
 @app.get("/", tags=["Health Check"])
-def read_root():
-    return {"status": "API is running"}
\ No newline at end of file
+async def read_root():
+    return {"status": "API is running"}
+
+@app.get("/startup", tags=["Health Check"])
+async def read_startup_timings():
+    """How long each startup phase of this worker took, in milliseconds."""
+    return {name: round(seconds * 1000, 1) for name, seconds in startup_timings.items()}
+
+@app.get("/cache/stats", tags=["Health Check"])
+async def read_cache_stats():
+    """Hit/miss counters of this worker's donor caches."""
+    return cache_stats()
+
+@app.get("/metrics", tags=["Health Check"])
+async def read_metrics():
+    """Prometheus metrics: request/stage latency histograms, SQL statements per request, pool checkout waits and cache lookups."""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE_LATEST)
+
+@app.get("/models/ranking", tags=["Health Check"])
+async def read_ranking_model():
+    """The ranking model this worker serves, and its artifact's load history."""
+    return ranking.registry.info()
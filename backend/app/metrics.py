@@ -0,0 +1,126 @@
+# backend/app/metrics.py
+"""Request instrumentation: Prometheus metrics and per-request stage timings.
+
+`RequestMetricsMiddleware` times every HTTP request by method, route template and status. Code
+marks its stages with `with span("stage"):`, and SQLAlchemy cursor hooks count statements and their
+time; both feed Prometheus histograms and the current request's `RequestTimings`. A request sent with
+an `X-Debug-Timings` header gets them back as a standard `Server-Timing` response header (unless
+DEBUG_TIMINGS_ENABLED is off). `render()` produces the `/metrics` payload; under gunicorn,
+PROMETHEUS_MULTIPROC_DIR is set and the workers' metrics are aggregated from there.
+"""
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, Optional, Type
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+from starlette.datastructures import MutableHeaders
+
+DEBUG_TIMINGS_ENABLED = os.getenv("DEBUG_TIMINGS_ENABLED", "true").lower() in ("1", "true", "yes")
+DEBUG_TIMINGS_HEADER = b"x-debug-timings"
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "HTTP request latency.", ["method", "route", "status"], buckets=LATENCY_BUCKETS)
+STAGE_SECONDS = Histogram("request_stage_duration_seconds", "Time spent in an instrumented stage of a request.", ["stage"], buckets=LATENCY_BUCKETS)
+DB_QUERY_SECONDS = Histogram("db_query_duration_seconds", "SQL statement execution time.", buckets=LATENCY_BUCKETS)
+DB_QUERIES_PER_REQUEST = Histogram("db_queries_per_request", "SQL statements executed per HTTP request.", ["route"], buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100))
+POOL_CHECKOUT_SECONDS = Histogram("db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection.", buckets=LATENCY_BUCKETS)
+POOL_CHECKED_OUT = Gauge("db_pool_checked_out_connections", "Connections currently checked out of the pool.", multiprocess_mode="livesum")
+CACHE_LOOKUPS = Counter("cache_lookups_total", "Cache lookups by cache and outcome (hit rate = hit / (hit + miss)).", ["cache", "result"])
+
+@dataclass
+class RequestTimings:
+    stages: Dict[str, float] = field(default_factory=dict)
+    queries: int = 0
+    query_seconds: float = 0.0
+
+    def add(self, stage: str, seconds: float) -> None: self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def server_timing(self, total_seconds: float) -> str:
+        parts = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in self.stages.items()]
+        parts.append(f'db;dur={self.query_seconds * 1000:.2f};desc="{self.queries} queries"')
+        parts.append(f"total;dur={total_seconds * 1000:.2f}")
+        return ", ".join(parts)
+
+# Copied into threadpool calls and `run_sync` greenlets, so stages recorded there land on the request.
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try: yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.labels(stage).observe(elapsed)
+        timings = _current.get()
+        if timings is not None: timings.add(stage, elapsed)
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    DB_QUERY_SECONDS.observe(elapsed)
+    timings = _current.get()
+    if timings is not None: timings.queries += 1; timings.query_seconds += elapsed
+
+def _handle_error(context):
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started: started.pop()
+
+def instrument_engine(engine) -> None:
+    """Statement count/duration hooks and the checked-out connections gauge for a (sync) Engine."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    event.listen(engine, "checkout", lambda *args: POOL_CHECKED_OUT.inc())
+    event.listen(engine, "checkin", lambda *args: POOL_CHECKED_OUT.dec())
+
+def timed_pool(pool_class: Type[Pool]) -> Type[Pool]:
+    """`pool_class` reporting how long each checkout waited (including pre-ping) to POOL_CHECKOUT_SECONDS."""
+    class TimedPool(pool_class):
+        def connect(self):
+            started = time.perf_counter()
+            try: return super().connect()
+            finally: POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - started)
+    TimedPool.__name__ = TimedPool.__qualname__ = f"Timed{pool_class.__name__}"
+    return TimedPool
+
+class RequestMetricsMiddleware:
+    """ASGI middleware recording request latency and DB statements per request, and answering X-Debug-Timings."""
+    def __init__(self, app): self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http": return await self.app(scope, receive, send)
+        timings = RequestTimings(); token = _current.set(timings)
+        started = time.perf_counter(); status_code = 500
+        debug = DEBUG_TIMINGS_ENABLED and any(name == DEBUG_TIMINGS_HEADER for name, _ in scope["headers"])
+        async def send_with_timings(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if debug: MutableHeaders(scope=message).append("Server-Timing", timings.server_timing(time.perf_counter() - started))
+            await send(message)
+        try:
+            await self.app(scope, receive, send_with_timings)
+        finally:
+            route = scope.get("route")
+            route_label = getattr(route, "path", "unmatched")
+            REQUEST_SECONDS.labels(scope["method"], route_label, str(status_code)).observe(time.perf_counter() - started)
+            DB_QUERIES_PER_REQUEST.labels(route_label).observe(timings.queries)
+            _current.reset(token)
+
+def render() -> bytes:
+    """Prometheus text exposition of this process, or of all workers when PROMETHEUS_MULTIPROC_DIR is set."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
@@ -0,0 +1,111 @@
+# backend/app/migrations.py
+"""Versioned, forward-only schema upgrades.
+
+`create_all` only creates missing tables, so columns and indexes added to existing tables are
+applied here. Each migration runs once, in its own transaction, and is recorded in
+`schema_migrations`. Migrations write through `table()`/`column()` stubs rather than the model
+tables, so they keep working as the models grow. Run with `python -m app.migrations` (or
+`python migrations.py` from app/).
+"""
+from datetime import datetime
+from typing import Callable, List, Tuple
+from sqlalchemy import Column, Integer, String, DateTime, MetaData, Table, inspect, select, update, table, column
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.ext.compiler import compiles
+try:
+    from . import geo, models
+except ImportError:
+    import sys
+    import os
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    import geo, models
+
+migration_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations", migration_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = []
+
+def migration(version: int, description: str):
+    def register(fn: Callable[[Connection], None]):
+        MIGRATIONS.append((version, description, fn)); MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return register
+
+class sql_normalize_city(FunctionElement):
+    """SQL twin of `models.normalize_city`: lowercased text before the first comma of a location."""
+    type = String(); name = "sql_normalize_city"; inherit_cache = True
+
+def _city_sql(location: str, position: str) -> str:
+    return f"CASE WHEN {position} > 0 THEN lower(trim(substr({location}, 1, {position} - 1))) ELSE lower({location}) END"
+
+@compiles(sql_normalize_city)
+def _normalize_city_default(element, compiler, **kw):
+    location = compiler.process(list(element.clauses)[0], **kw)
+    return _city_sql(location, f"strpos({location}, ',')")
+
+@compiles(sql_normalize_city, "sqlite")
+def _normalize_city_sqlite(element, compiler, **kw):
+    location = compiler.process(list(element.clauses)[0], **kw)
+    return _city_sql(location, f"instr({location}, ',')")
+
+def _add_column_if_missing(conn: Connection, model, column_name: str) -> None:
+    table = model.__table__
+    if column_name in {c["name"] for c in inspect(conn).get_columns(table.name)}: return
+    column = table.c[column_name]
+    conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=conn.dialect)}")
+
+@migration(1, "normalized city column on hospitals/donors and composite donor indexes")
+def _city_and_donor_indexes(conn: Connection) -> None:
+    for model in (models.Hospital, models.Donor):
+        _add_column_if_missing(conn, model, "city")
+        rows = table(model.__tablename__, column("city"), column("location"))
+        conn.execute(update(rows).where(rows.c.city.is_(None)).values(city=sql_normalize_city(rows.c.location)))
+    for index in models.Donor.__table__.indexes:
+        if index.name in ("ix_donors_hospital_status_blood_type", "ix_donors_hospital_full_name"): index.create(conn, checkfirst=True)
+
+@migration(2, "donors.updated_at for delta sync of the dashboard listing")
+def _donor_updated_at(conn: Connection) -> None:
+    _add_column_if_missing(conn, models.Donor, "updated_at")
+    rows = table("donors", column("updated_at", DateTime))
+    conn.execute(update(rows).where(rows.c.updated_at.is_(None)).values(updated_at=datetime.utcnow()))
+    if conn.dialect.name != "sqlite": conn.exec_driver_sql("ALTER TABLE donors ALTER COLUMN updated_at SET NOT NULL")
+    for index in models.Donor.__table__.indexes:
+        if index.name == "ix_donors_hospital_updated_at": index.create(conn, checkfirst=True)
+
+@migration(3, "gazetteer coordinates and grid cell on hospitals/donors for proximity search")
+def _coordinates(conn: Connection) -> None:
+    for model in (models.Hospital, models.Donor):
+        for name in ("latitude", "longitude", "geo_cell"): _add_column_if_missing(conn, model, name)
+        rows = table(model.__tablename__, column("city"), column("latitude"), column("longitude"), column("geo_cell"))
+        # One UPDATE per distinct city: the gazetteer lives in Python, not in the database.
+        for city in conn.execute(select(rows.c.city).where(rows.c.latitude.is_(None)).distinct()).scalars().all():
+            coords = geo.geocode(city)
+            if coords is None: continue
+            conn.execute(update(rows).where(rows.c.city == city, rows.c.latitude.is_(None)).values(latitude=coords[0], longitude=coords[1], geo_cell=geo.grid_cell(*coords)))
+    for index in models.Donor.__table__.indexes:
+        if index.name == "ix_donors_geo_cell_status_blood_type": index.create(conn, checkfirst=True)
+
+def upgrade(engine: Engine) -> List[int]:
+    """Creates missing tables, then applies pending migrations in order. Returns the versions applied."""
+    models.Base.metadata.create_all(bind=engine)
+    migration_metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        done = set(conn.execute(select(schema_migrations.c.version)).scalars())
+    applied = []
+    for version, description, fn in MIGRATIONS:
+        if version in done: continue
+        with engine.begin() as conn:
+            fn(conn)
+            conn.execute(schema_migrations.insert().values(version=version, description=description, applied_at=datetime.utcnow()))
+        applied.append(version)
+    return applied
+
+if __name__ == "__main__":
+    applied = upgrade(models.engine)
+    print(f"Applied migrations: {applied}" if applied else "Schema is up to date.")
@@ -0,0 +1,147 @@
+# backend/app/model_registry.py
+"""Ranking models and the registry that serves the active one.
+
+A model maps the candidate feature matrix (one column per `ranking.FEATURES` entry) to scores in a
+single batch call, and explains any subset of rows as per-feature contributions. Two artifact kinds
+are loaded from RANKING_MODEL_PATH:
+
+* `*.txt` - a LightGBM booster (`Booster.save_model`); contributions come from a SHAP TreeExplainer
+  built once at load time, or LightGBM's own `pred_contrib` when shap is not installed.
+* `*.json` - a linear model: `{"type": "linear", "weights": {feature: weight}, "intercept": 0.0}`.
+
+lightgbm and shap are imported only when a LightGBM artifact is configured. A preloading server may
+import them in the master (`preload_imports`), but boosters are only ever built in the worker that
+uses them: LightGBM's OpenMP runtime is not fork-safe, and a booster created before the fork hangs
+on its first predict in the child. The registry re-checks the artifact's mtime at most every
+RANKING_MODEL_CHECK_SECONDS and swaps in a new model without a restart; a bad artifact is logged and
+the previous model keeps serving. Without an artifact the fallback (the heuristic weights) is used.
+"""
+import os
+import json
+import time
+import logging
+import threading
+import numpy as np
+from typing import Any, Dict, Optional, Sequence
+
+RANKING_MODEL_PATH = os.getenv("RANKING_MODEL_PATH", "")
+RANKING_MODEL_CHECK_SECONDS = float(os.getenv("RANKING_MODEL_CHECK_SECONDS", "10"))
+
+logger = logging.getLogger("uvicorn.error")
+
+class RankingModel:
+    name: str = "model"
+    features: Sequence[str] = ()
+    # Normalised models get min-max scaled scores; the others already predict a probability.
+    normalized: bool = True
+
+    def predict(self, X: np.ndarray) -> np.ndarray: raise NotImplementedError
+    def contributions(self, X: np.ndarray) -> np.ndarray: raise NotImplementedError
+
+    def info(self) -> Dict[str, Any]:
+        return {"name": self.name, "type": type(self).__name__, "features": list(self.features), "normalized": self.normalized}
+
+class LinearModel(RankingModel):
+    """score = X . weights + intercept, optionally clipped at zero; contributions are weight x value."""
+    def __init__(self, name: str, features: Sequence[str], weights: Sequence[float], intercept: float = 0.0, clip_at_zero: bool = False):
+        self.name = name; self.features = list(features); self.intercept = intercept; self.clip_at_zero = clip_at_zero
+        self.weights = np.asarray(weights, dtype=float)
+
+    @classmethod
+    def from_json(cls, path: str, features: Sequence[str]) -> "LinearModel":
+        with open(path, encoding="utf-8") as f: spec = json.load(f)
+        if spec.get("type") != "linear": raise ValueError(f"{path}: unsupported model type {spec.get('type')!r}")
+        unknown = set(spec["weights"]) - set(features)
+        if unknown: raise ValueError(f"{path}: unknown features {sorted(unknown)}")
+        return cls(os.path.basename(path), features, [spec["weights"].get(f, 0.0) for f in features], float(spec.get("intercept", 0.0)), bool(spec.get("clip_at_zero", False)))
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        scores = np.full(len(X), self.intercept)
+        for j, weight in enumerate(self.weights): scores = scores + X[:, j] * weight  # column by column, like the SQL ranker's sum
+        return np.clip(scores, 0, None) if self.clip_at_zero else scores
+
+    def contributions(self, X: np.ndarray) -> np.ndarray: return X * self.weights
+
+class LightGBMModel(RankingModel):
+    """A LightGBM booster over (a subset of) the ranking features, matched by name (spaces as underscores)."""
+    def __init__(self, path: str, features: Sequence[str]):
+        import lightgbm
+        self.name = os.path.basename(path); self.features = list(features)
+        self.booster = lightgbm.Booster(model_file=path)
+        by_name = {f.replace(" ", "_"): i for i, f in enumerate(features)}
+        missing = [n for n in self.booster.feature_name() if n not in by_name]
+        if missing: raise ValueError(f"{path}: unknown features {missing}")
+        self.columns = [by_name[n] for n in self.booster.feature_name()]
+        self.normalized = not str(self.booster.params.get("objective", "")).startswith(("binary", "cross_entropy"))
+        try:
+            import shap
+            self.explainer = shap.TreeExplainer(self.booster)
+        except ImportError:
+            self.explainer = None
+
+    def predict(self, X: np.ndarray) -> np.ndarray: return self.booster.predict(X[:, self.columns])
+
+    def contributions(self, X: np.ndarray) -> np.ndarray:
+        if self.explainer is not None:
+            values = self.explainer.shap_values(X[:, self.columns])
+            values = values[-1] if isinstance(values, list) else values
+        else:
+            values = self.booster.predict(X[:, self.columns], pred_contrib=True)[:, :-1]  # last column is the expected value
+        out = np.zeros((len(X), len(self.features)))
+        out[:, self.columns] = values
+        return out
+
+    def info(self) -> Dict[str, Any]:
+        return {**super().info(), "explainer": "shap.TreeExplainer" if self.explainer is not None else "lightgbm.pred_contrib"}
+
+def preload_imports(path: str = RANKING_MODEL_PATH) -> None:
+    """Imports the libraries `path`'s artifact needs without building a model; safe before a fork."""
+    if not path.endswith(".txt"): return
+    import lightgbm  # noqa: F401
+    try: import shap  # noqa: F401
+    except ImportError: pass
+
+def load_model(path: str, features: Sequence[str]) -> RankingModel:
+    if path.endswith(".json"): return LinearModel.from_json(path, features)
+    if path.endswith(".txt"): return LightGBMModel(path, features)
+    raise ValueError(f"{path}: expected a LightGBM .txt or linear .json artifact")
+
+class ModelRegistry:
+    """Holds the active model; `current()` is cheap and hot-swaps when the artifact changes on disk."""
+    def __init__(self, fallback: RankingModel, path: str = RANKING_MODEL_PATH, check_seconds: float = RANKING_MODEL_CHECK_SECONDS):
+        self.fallback = fallback; self.path = path; self.check_seconds = check_seconds
+        self._model: Optional[RankingModel] = None
+        self._mtime: Optional[float] = None
+        self._checked = float("-inf")
+        self._lock = threading.Lock()
+        self.loads = 0; self.failures = 0; self.error: Optional[str] = None
+
+    def current(self) -> RankingModel:
+        if self.path and time.monotonic() - self._checked >= self.check_seconds: self.refresh()
+        return self._model or self.fallback
+
+    def refresh(self) -> RankingModel:
+        """Loads the artifact if it changed since the last load. Concurrent callers keep serving the old model meanwhile."""
+        if not self._lock.acquire(blocking=False): return self._model or self.fallback
+        try:
+            self._checked = time.monotonic()
+            try: mtime = os.stat(self.path).st_mtime
+            except OSError: mtime = None
+            if mtime is None:
+                if self._model is not None: logger.warning("Ranking model %s is gone; using %s", self.path, self.fallback.name)
+                self._model = None; self._mtime = None
+            elif mtime != self._mtime:
+                try:
+                    model = load_model(self.path, self.fallback.features)
+                except Exception as e:
+                    self.failures += 1; self.error = f"{type(e).__name__}: {e}"; self._mtime = mtime
+                    logger.exception("Failed to load ranking model %s; keeping %s", self.path, (self._model or self.fallback).name)
+                else:
+                    self._model = model; self._mtime = mtime; self.loads += 1; self.error = None
+                    logger.info("Loaded ranking model %s", model.name)
+            return self._model or self.fallback
+        finally:
+            self._lock.release()
+
+    def info(self) -> Dict[str, Any]:
+        return { "active": (self._model or self.fallback).info(), "path": self.path or None, "loads": self.loads, "failures": self.failures, "error": self.error, }
@@ -1,20 +1,75 @@
 # backend/app/models.py
 import os
 import enum
+from datetime import datetime
+from typing import Optional
 from sqlalchemy import (create_engine, Column, Integer, String, Float,
-                      DateTime, Boolean, ForeignKey, Enum as SQLAlchemyEnum)
-from sqlalchemy.orm import relationship, sessionmaker, DeclarativeBase
+                      DateTime, Boolean, ForeignKey, Index, Enum as SQLAlchemyEnum)
+from sqlalchemy.orm import relationship, sessionmaker, validates, DeclarativeBase
 from sqlalchemy.sql import func
-from sqlalchemy.engine import create_engine
+from sqlalchemy.engine import create_engine, make_url
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+try: from . import geo, metrics
+except ImportError: import geo, metrics
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL: raise ValueError("DATABASE_URL environment variable is not set")
-engine = create_engine(DATABASE_URL)
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+def engine_options(url: str, is_async: bool = False) -> dict:
+    """Pool settings from the DB_POOL_* variables, on a queue pool that reports checkout waits; SQLite keeps
+    SQLAlchemy's default pool sizing (and its default pool class for in-memory databases)."""
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite":
+        options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT, pool_recycle=DB_POOL_RECYCLE)
+    if parsed.get_backend_name() != "sqlite" or parsed.database not in (None, "", ":memory:"):
+        options["poolclass"] = metrics.timed_pool(AsyncAdaptedQueuePool if is_async else QueuePool)
+    return options
+
+def async_database_url(url: str) -> str:
+    """DATABASE_URL with its driver swapped for the asyncio one (asyncpg / aiosqlite), unless ASYNC_DATABASE_URL is set."""
+    if os.getenv("ASYNC_DATABASE_URL"): return os.environ["ASYNC_DATABASE_URL"]
+    parsed = make_url(url)
+    return parsed.set(drivername=ASYNC_DRIVERS.get(parsed.get_backend_name(), parsed.drivername)).render_as_string(hide_password=False)
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+metrics.instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = None; AsyncSessionLocal = None
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    async_engine = create_async_engine(async_database_url(DATABASE_URL), **engine_options(DATABASE_URL, is_async=True))
+    metrics.instrument_engine(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 class Base(DeclarativeBase):
     pass
 
+def normalize_city(location: Optional[str]) -> str:
+    """Lowercased city part of a free-text "City, State" location."""
+    if not location: return ""
+    return location.split(',')[0].strip().lower() if ',' in location else location.lower()
+
+def location_fields(location: Optional[str]) -> dict:
+    """Stored columns derived from a location: normalized city, gazetteer coordinates and grid cell (None when the city is unknown)."""
+    city = normalize_city(location)
+    latitude, longitude = geo.geocode(city) or (None, None)
+    return {"city": city, "latitude": latitude, "longitude": longitude, "geo_cell": geo.grid_cell(latitude, longitude)}
+
+class CityMixin:
+    """Keeps the stored `city`, coordinate and grid-cell columns in sync with `location` on every assignment."""
+    @validates("location")
+    def _sync_city(self, key, location):
+        for name, value in location_fields(location).items(): setattr(self, name, value)
+        return location
+
 class BloodType(str, enum.Enum):
     AP = "A+"; AN = "A-"; BP = "B+"; BN = "B-"; ABP = "AB+"; ABN = "AB-"; OP = "O+"; ON = "O-"
 
@@ -23,31 +78,48 @@ class DonorStatus(str, enum.Enum):
     ACTIVE = "active"
     INACTIVE = "inactive"
 
-class Hospital(Base):
+class Hospital(CityMixin, Base):
     __tablename__ = "hospitals"
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     email = Column(String, unique=True, index=True)
     hashed_password = Column(String)
     location = Column(String)
+    city = Column(String)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    geo_cell = Column(Integer, nullable=True)
     donors = relationship("Donor", back_populates="hospital")
 
-class Donor(Base):
+class Donor(CityMixin, Base):
     __tablename__ = "donors"
+    __table_args__ = (
+        Index("ix_donors_hospital_status_blood_type", "hospital_id", "status", "blood_type"),
+        Index("ix_donors_hospital_full_name", "hospital_id", "full_name"),
+        Index("ix_donors_hospital_updated_at", "hospital_id", "updated_at"),
+        Index("ix_donors_geo_cell_status_blood_type", "geo_cell", "status", "blood_type"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     full_name = Column(String)
     email = Column(String, unique=True, index=True)
     phone = Column(String, unique=True, index=True)
     blood_type = Column(SQLAlchemyEnum(BloodType))
     location = Column(String)
+    city = Column(String)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    geo_cell = Column(Integer, nullable=True)
     last_donation_date = Column(DateTime, nullable=True)
     reliability_score = Column(Float, default=0.75)
     fatigue_level = Column(Float, default=0.0)
     status = Column(SQLAlchemyEnum(DonorStatus), default=DonorStatus.PENDING_APPROVAL, nullable=False)
     hospital_id = Column(Integer, ForeignKey("hospitals.id"))
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     hospital = relationship("Hospital", back_populates="donors")
 
 def create_db_tables():
-     print("Ensuring database tables exist...")
-     Base.metadata.create_all(bind=engine)
-     print("Table check complete.")
\ No newline at end of file
+     try: from .migrations import upgrade
+     except ImportError: from migrations import upgrade
+     print("Ensuring database schema is up to date...")
+     applied = upgrade(engine)
+     print(f"Schema check complete ({len(applied)} migration(s) applied).")
\ No newline at end of file
@@ -0,0 +1,72 @@
+# backend/app/network_search.py
+"""Opt-in network-wide donor search across every hospital's donors.
+
+Each hospital is one shard. Shards that cannot contribute are pruned up front: only hospitals
+holding an active donor of a compatible type (within the radius' prefilter, when one is given) are
+visited. Each shard retrieves, filters and scores its candidates on a dedicated thread pool, with
+its own session, so retrieval and scoring of the shards run in parallel. Candidates come from the
+shard's pool in `donor_cache.network_pools`; with caching disabled, each shard fetches just its
+active compatible donors as plain columns. `ranking.merge_shards` merges the per-shard top-k into
+one global ranking with globally normalised scores. The search opens its own sessions, so callers
+run it in the threadpool rather than on a request session.
+"""
+import os
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy import exists, select
+from sqlalchemy.orm import Session
+try:
+    from . import metrics, models, ranking, serialization, sql_ranking
+    from .donor_cache import network_pools
+except ImportError:
+    import sys
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    import metrics, models, ranking, serialization, sql_ranking
+    from donor_cache import network_pools
+
+NETWORK_SEARCH_WORKERS = int(os.getenv("NETWORK_SEARCH_WORKERS", str(min(8, os.cpu_count() or 1))))
+NETWORK_SEARCH_DEFAULT_LIMIT = int(os.getenv("NETWORK_SEARCH_DEFAULT_LIMIT", "50"))
+
+_shard_pool = ThreadPoolExecutor(max_workers=NETWORK_SEARCH_WORKERS, thread_name_prefix="network-search")
+
+def _candidate_conditions(compatible_types: Sequence[str], origin: ranking.Origin, radius_km: Optional[float]) -> List[Any]:
+    Donor = models.Donor
+    conditions = [Donor.status == models.DonorStatus.ACTIVE, Donor.blood_type.in_(compatible_types)]
+    within = sql_ranking.location_terms(Donor, origin, radius_km)[2]
+    if within is not None: conditions.append(within)
+    return conditions
+
+def shard_hospitals(db: Session, compatible_types: Sequence[str], origin: ranking.Origin, radius_km: Optional[float] = None) -> List[int]:
+    """Ids of the hospitals holding an active compatible donor (within the radius), in id order."""
+    # One EXISTS probe per hospital stops at its first candidate, where DISTINCT would visit them all.
+    candidate = exists().where(models.Donor.hospital_id == models.Hospital.id, *_candidate_conditions(compatible_types, origin, radius_km))
+    query = select(models.Hospital.id).where(candidate).order_by(models.Hospital.id)
+    return list(db.execute(query).scalars())
+
+def fetch_candidates(db: Session, hospital_id: int, compatible_types: Sequence[str], origin: ranking.Origin, radius_km: Optional[float] = None) -> List[Any]:
+    """One hospital's active compatible donors as column rows: the `schemas.Donor` fields plus the location columns."""
+    Donor = models.Donor
+    query = select(*serialization.DONOR_COLUMNS, Donor.city, Donor.latitude, Donor.longitude).where(Donor.hospital_id == hospital_id, *_candidate_conditions(compatible_types, origin, radius_km)).order_by(Donor.id)
+    return db.execute(query).all()
+
+def _score_shard(hospital_id: int, compatible_types: Sequence[str], hospital_location: str, radius_km: Optional[float], model: ranking.RankingModel) -> Tuple[ranking.DonorFeatures, np.ndarray]:
+    with models.SessionLocal() as db:
+        if network_pools.enabled:
+            features = network_pools.get(db, hospital_id).features(compatible_types, hospital_location, radius_km)
+        else:
+            features = ranking.calculate_features(fetch_candidates(db, hospital_id, compatible_types, ranking.Origin.at(hospital_location), radius_km), hospital_location, radius_km)
+    return features, ranking.raw_scores(features, model)
+
+def rank_network(hospital_location: str, compatible_types: List[str], limit: Optional[int] = None, radius_km: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Top `limit` donors across all hospitals, ranked relative to `hospital_location`."""
+    limit = limit or NETWORK_SEARCH_DEFAULT_LIMIT
+    model = ranking.registry.current()  # one model for every shard, even if a new one is swapped in meanwhile
+    with models.SessionLocal() as db: hospital_ids = shard_hospitals(db, compatible_types, ranking.Origin.at(hospital_location), radius_km)
+    with metrics.span("shard_scoring"):
+        # Each task runs in a copy of this context, so its SQL statements still count towards the request.
+        futures = [_shard_pool.submit(contextvars.copy_context().run, _score_shard, hospital_id, compatible_types, hospital_location, radius_km, model) for hospital_id in hospital_ids]
+        shards = [future.result() for future in futures]
+    with metrics.span("merge_shards"): ranked = ranking.merge_shards([s for s in shards if not s[0].empty], limit, model=model, top_k=_shard_pool.map)
+    return [serialization.ranked_row(r) for r in ranked]
@@ -1,64 +1,232 @@
 # backend/app/ranking.py
-import pandas as pd
+import os
 import numpy as np
+from dataclasses import dataclass
 from datetime import datetime
 try:
-    from .models import BloodType
-    from .schemas import MatchExplanation
+    from . import geo
+    from .model_registry import LinearModel, ModelRegistry, RankingModel
+    from .models import BloodType, normalize_city
 except ImportError:
     import sys
     import os
     sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-    from models import BloodType
-    from schemas import MatchExplanation
-from typing import List, Dict, Any
+    import geo
+    from model_registry import LinearModel, ModelRegistry, RankingModel
+    from models import BloodType, normalize_city
+from typing import Callable, List, Dict, Any, Optional, Sequence, Tuple
 
 COMPATIBILITY_MATRIX = { "A+": ["A+", "A-", "O+", "O-"], "A-": ["A-", "O-"], "B+": ["B+", "B-", "O+", "O-"], "B-": ["B-", "O-"], "AB+": ["A+", "A-", "B+", "B-", "AB+", "AB-", "O+", "O-"], "AB-": ["A-", "B-", "AB-", "O-"], "O+": ["O+", "O-"], "O-": ["O-"], }
+WEIGHTS = { 'Reliability': 0.6, 'Proximity': 0.3, 'Fatigue': -0.1, 'Days Since Donation': 0.05 / 365 }
+MIN_DAYS_BETWEEN_DONATIONS = 90
+NEVER_DONATED_DAYS = 999
+BLOOD_TYPES = list(COMPATIBILITY_MATRIX)
+BLOOD_TYPE_INDEX = {bt: i for i, bt in enumerate(BLOOD_TYPES)}
+# Bit i stands for BLOOD_TYPES[i]: ACCEPTS_MASK[r] is the donor types recipient r can take, SERVES_MASK[d] the recipients donor d can give to.
+ACCEPTS_MASK = np.array([sum(1 << BLOOD_TYPE_INDEX[d] for d in COMPATIBILITY_MATRIX[r]) for r in BLOOD_TYPES], dtype=np.int64)
+SERVES_MASK = np.array([sum(1 << BLOOD_TYPE_INDEX[r] for r in BLOOD_TYPES if d in COMPATIBILITY_MATRIX[r]) for d in BLOOD_TYPES], dtype=np.int64)
+POPCOUNT = np.array([bin(m).count("1") for m in range(1 << len(BLOOD_TYPES))], dtype=np.int64)
+RANKING_ENGINE = os.getenv("RANKING_ENGINE", "python")  # "python" (NumPy ranker) or "sql" (database-side ranker)
+FEATURES = list(WEIGHTS)  # columns of the feature matrix models score
+EXPLAINED_FEATURES = {"Reliability": 0, "Location": 1, "Fatigue": 2}  # explanation_shap entries -> feature matrix column
+HEURISTIC = LinearModel("heuristic", FEATURES, [WEIGHTS[f] for f in FEATURES], clip_at_zero=True)
+registry = ModelRegistry(HEURISTIC)  # serves RANKING_MODEL_PATH when set, the heuristic otherwise
 
 def get_compatible_types(blood_type_needed: BloodType | str) -> List[str]:
     bt_value = blood_type_needed.value if isinstance(blood_type_needed, BloodType) else blood_type_needed
     return COMPATIBILITY_MATRIX.get(bt_value, [])
 
-def calculate_features(donors: List[Any], hospital_location: str) -> pd.DataFrame:
-    features = []; hospital_city = hospital_location.split(',')[0].strip().lower() if ',' in hospital_location else hospital_location.lower()
-    for donor in donors:
-        days_since_last = 999
-        if donor.last_donation_date: days_since_last = (datetime.now() - donor.last_donation_date).days
-        if days_since_last < 90: continue
-        donor_city = donor.location.split(',')[0].strip().lower() if ',' in donor.location else donor.location.lower()
-        is_local = 1.0 if donor_city == hospital_city else 0.0
-        features.append({ "donor": donor, "Reliability": donor.reliability_score, "Fatigue": donor.fatigue_level, "Days Since Donation": days_since_last, "Is Local": is_local, })
-    if not features: return pd.DataFrame()
-    return pd.DataFrame(features)
-
-def rank_donors(donors_df: pd.DataFrame) -> List[Dict[str, Any]]:
-    if donors_df.empty: return []
-    weights = { 'Reliability': 0.6, 'Is Local': 0.3, 'Fatigue': -0.1, 'Days Since Donation': 0.05 / 365 }
-    scores = ( donors_df['Reliability'] * weights['Reliability'] + donors_df['Is Local'] * weights['Is Local'] + donors_df['Fatigue'] * weights['Fatigue'] + (donors_df['Days Since Donation'] * weights['Days Since Donation']) ); scores = scores.clip(lower=0)
-    min_score, max_score = scores.min(), scores.max()
-    if max_score > min_score: donors_df['probability_score'] = (scores - min_score) / (max_score - min_score)
-    else: donors_df['probability_score'] = 0.5 if len(donors_df) > 0 else 0.0
-    donors_df['probability_score'] = donors_df['probability_score'].fillna(0.5)
-    donors_df = donors_df.sort_values(by="probability_score", ascending=False).reset_index()
-    ranked_results = []
-    for i, row in donors_df.iterrows():
-        shap_factors: List[MatchExplanation] = [
-            MatchExplanation(feature="Reliability", value=row.Reliability, impact=row.Reliability * weights['Reliability']),
-            MatchExplanation(feature="Location", value=row['Is Local'], impact=row['Is Local'] * weights['Is Local']),
-            MatchExplanation(feature="Fatigue", value=row.Fatigue, impact=row.Fatigue * weights['Fatigue'])
-        ]
-        sorted_factors = sorted(shap_factors, key=lambda x: abs(x.impact), reverse=True)
-        top_positive = next((f for f in sorted_factors if f.impact > 0.01), None)
-        top_negative = next((f for f in sorted_factors if f.impact < -0.01), None)
-        explanation_parts = []
-        if top_positive:
-            feature_value_text = f" ({top_positive.value*100:.0f}% score)" if top_positive.feature == "Reliability" else ""
-            explanation_parts.append(f"Primary positive factor: **{top_positive.feature}**{feature_value_text}.")
-        if row['Is Local'] > 0 and (not top_positive or top_positive.feature != "Location"): explanation_parts.append("Good proximity (same city).")
-        if top_negative:
-             if top_negative.feature == "Fatigue": explanation_parts.append(f"Rank slightly lowered by fatigue level ({row.Fatigue:.2f}).")
-        elif row['Is Local'] == 0 and (not top_positive or top_positive.feature != "Location"): explanation_parts.append("Located in a different city.")
-        human_insight = f"Rank #{i+1}. " + " ".join(explanation_parts)
-        if not explanation_parts: human_insight = f"Rank #{i+1}. Score based on reliability, location, and fatigue."
-        ranked_results.append({ "donor": row.donor, "probability_score": row.probability_score, "rank": i + 1, "explanation_human": human_insight.strip(), "explanation_shap": shap_factors, })
-    return ranked_results
\ No newline at end of file
+@dataclass(frozen=True)
+class Origin:
+    """Where candidates are measured from: a hospital's normalized city and its gazetteer coordinates, if known."""
+    city: str
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+
+    @classmethod
+    def at(cls, location: Optional[str]) -> "Origin":
+        city = normalize_city(location)
+        coords = geo.geocode(city)
+        return cls(city, *coords) if coords else cls(city)
+
+    @property
+    def located(self) -> bool: return self.latitude is not None
+
+@dataclass
+class DonorFeatures:
+    """Column-oriented feature matrix: one NumPy array per feature; `rows[i]` locates feature row i in `donors`."""
+    donors: Sequence[Any]
+    rows: np.ndarray
+    reliability: np.ndarray
+    fatigue: np.ndarray
+    days_since_donation: np.ndarray
+    proximity: np.ndarray
+    distance_km: np.ndarray
+    blood_types: np.ndarray
+
+    def __len__(self) -> int: return len(self.rows)
+
+    @property
+    def empty(self) -> bool: return len(self.rows) == 0
+
+def days_since(dates: Sequence[Optional[datetime]] | np.ndarray, now: Optional[datetime] = None) -> np.ndarray:
+    """Whole days elapsed since each date (floored like `timedelta.days`); missing dates count as NEVER_DONATED_DAYS."""
+    now = np.datetime64(now or datetime.now(), "us")
+    stamps = np.asarray(dates, dtype="datetime64[us]")
+    missing = np.isnat(stamps)
+    days = (now - np.where(missing, now, stamps)) // np.timedelta64(1, "D")
+    return np.where(missing, NEVER_DONATED_DAYS, days).astype(np.int64)
+
+def locate(cities: np.ndarray, latitudes: np.ndarray, longitudes: np.ndarray, origin: Origin) -> Tuple[np.ndarray, np.ndarray]:
+    """(squared distance in km^2, proximity) per donor. Proximity falls from 1 at the origin to 0 at PROXIMITY_RADIUS_KM;
+    where either side has no coordinates it falls back to same-city equality (distance NaN)."""
+    same_city = (cities == origin.city).astype(float)
+    if not origin.located: return np.full(len(cities), np.nan), same_city
+    squared = geo.squared_distance_km(origin.latitude, origin.longitude, latitudes.astype(float), longitudes.astype(float))
+    return squared, np.where(np.isnan(squared), same_city, geo.proximity(squared))
+
+def build_features(donors: Sequence[Any], rows: np.ndarray, reliability: np.ndarray, fatigue: np.ndarray, last_donation: np.ndarray, cities: np.ndarray, latitudes: np.ndarray, longitudes: np.ndarray, blood_types: np.ndarray, origin: Origin, radius_km: Optional[float] = None) -> DonorFeatures:
+    """Applies the donation-interval eligibility filter, and the optional search radius, to aligned feature columns."""
+    days = days_since(last_donation)
+    squared, proximity = locate(cities, latitudes, longitudes, origin)
+    eligible = days >= MIN_DAYS_BETWEEN_DONATIONS
+    if radius_km is not None:
+        eligible &= np.where(np.isnan(squared), cities == origin.city, squared <= radius_km * radius_km)
+    return DonorFeatures(
+        donors=donors, rows=rows[eligible],
+        reliability=reliability[eligible].astype(float), fatigue=fatigue[eligible].astype(float),
+        days_since_donation=days[eligible], proximity=proximity[eligible], distance_km=np.sqrt(squared[eligible]), blood_types=blood_types[eligible],
+    )
+
+def calculate_features(donors: List[Any], hospital_location: str, radius_km: Optional[float] = None) -> DonorFeatures:
+    return build_features(
+        donors, np.arange(len(donors)),
+        np.array([d.reliability_score for d in donors], dtype=float), np.array([d.fatigue_level for d in donors], dtype=float),
+        np.array([d.last_donation_date for d in donors], dtype="datetime64[us]"), np.array([d.city for d in donors], dtype=object),
+        np.array([d.latitude for d in donors], dtype=float), np.array([d.longitude for d in donors], dtype=float),
+        np.array([getattr(d.blood_type, "value", d.blood_type) for d in donors], dtype=object), Origin.at(hospital_location), radius_km,
+    )
+
+def feature_matrix(features: DonorFeatures) -> np.ndarray:
+    return np.column_stack([features.reliability, features.proximity, features.fatigue, features.days_since_donation.astype(float)])
+
+def raw_scores(features: DonorFeatures, model: Optional[RankingModel] = None) -> np.ndarray:
+    """The model's scores for every candidate in one batch, before normalisation."""
+    return (model or registry.current()).predict(feature_matrix(features))
+
+def score_bounds(scores: np.ndarray) -> Optional[Tuple[float, float]]:
+    """(min, max) of the defined scores, or None when there are none."""
+    if scores.size == 0 or np.isnan(scores).all(): return None
+    return float(np.nanmin(scores)), float(np.nanmax(scores))
+
+def probabilities(scores: np.ndarray, model: RankingModel, bounds: Optional[Tuple[float, float]] = None) -> np.ndarray:
+    """Scores as probability_score: min-max normalised for normalised models, clipped to [0, 1] otherwise; undefined maps to 0.5."""
+    if model.normalized: return normalize_scores(scores, bounds)
+    return np.where(np.isnan(scores), 0.5, np.clip(scores, 0, 1))
+
+def score_features(features: DonorFeatures, model: Optional[RankingModel] = None) -> np.ndarray:
+    """Model score mapped to [0, 1]; for the heuristic, the weighted score clipped at zero and min-max normalised (flat or undefined -> 0.5)."""
+    model = model or registry.current()
+    return probabilities(raw_scores(features, model), model)
+
+def normalize_scores(scores: np.ndarray, bounds: Optional[Tuple[float, float]] = None) -> np.ndarray:
+    """Min-max normalisation over `bounds`, by default the scores' own; merged shards pass the global bounds."""
+    bounds = bounds if bounds is not None else score_bounds(scores)
+    if bounds is None: return np.full(scores.shape, 0.5)
+    min_score, max_score = bounds
+    if max_score > min_score: probability = (scores - min_score) / (max_score - min_score)
+    else: probability = np.full(scores.shape, 0.5)
+    return np.where(np.isnan(probability), 0.5, probability)
+
+def top_k_order(scores: np.ndarray, limit: Optional[int] = None) -> np.ndarray:
+    """Indices of the `limit` best scores, best first; ties keep their input order (a stable descending sort)."""
+    n = len(scores)
+    candidates = np.arange(n) if limit is None or limit >= n else np.argpartition(-scores, limit - 1)[:limit]
+    return candidates[np.lexsort((candidates, -scores[candidates]))]
+
+def explain_match(reliability: float, proximity: float, fatigue: float, rank: int, distance_km: float = float("nan"), impacts: Optional[Sequence[float]] = None) -> Tuple[str, List[Dict[str, Any]]]:
+    """`impacts` are a model's contributions in FEATURES order; by default the heuristic's weight x value.
+    The factors are plain dicts in the shape of `schemas.MatchExplanation`."""
+    if impacts is None: impacts = (reliability * WEIGHTS['Reliability'], proximity * WEIGHTS['Proximity'], fatigue * WEIGHTS['Fatigue'])
+    shap_factors: List[Dict[str, Any]] = [
+        {"feature": "Reliability", "value": reliability, "impact": float(impacts[EXPLAINED_FEATURES["Reliability"]])},
+        {"feature": "Location", "value": proximity, "impact": float(impacts[EXPLAINED_FEATURES["Location"]])},
+        {"feature": "Fatigue", "value": fatigue, "impact": float(impacts[EXPLAINED_FEATURES["Fatigue"]])},
+    ]
+    sorted_factors = sorted(shap_factors, key=lambda x: abs(x["impact"]), reverse=True)
+    top_positive = next((f for f in sorted_factors if f["impact"] > 0.01), None)
+    top_negative = next((f for f in sorted_factors if f["impact"] < -0.01), None)
+    explanation_parts = []
+    if top_positive:
+        feature_value_text = f" ({top_positive['value']*100:.0f}% score)" if top_positive["feature"] == "Reliability" else ""
+        explanation_parts.append(f"Primary positive factor: **{top_positive['feature']}**{feature_value_text}.")
+    if proximity > 0 and (not top_positive or top_positive["feature"] != "Location"):
+        explanation_parts.append(f"Good proximity (~{distance_km:.0f} km away)." if distance_km >= 1 else "Good proximity (same city).")
+    if top_negative:
+         if top_negative["feature"] == "Fatigue": explanation_parts.append(f"Rank slightly lowered by fatigue level ({fatigue:.2f}).")
+    elif proximity == 0 and (not top_positive or top_positive["feature"] != "Location"): explanation_parts.append("Located in a different city.")
+    human_insight = f"Rank #{rank}. " + " ".join(explanation_parts)
+    if not explanation_parts: human_insight = f"Rank #{rank}. Score based on reliability, location, and fatigue."
+    return human_insight.strip(), shap_factors
+
+def _ranked(features: DonorFeatures, i: int, probability: float, rank: int, impacts: Sequence[float]) -> Dict[str, Any]:
+    explanation_human, shap_factors = explain_match(float(features.reliability[i]), float(features.proximity[i]), float(features.fatigue[i]), rank, float(features.distance_km[i]), impacts)
+    return { "donor": features.donors[features.rows[i]], "probability_score": float(probability), "rank": rank, "explanation_human": explanation_human, "explanation_shap": shap_factors, }
+
+def _explained(features: DonorFeatures, chosen: np.ndarray, probability: np.ndarray, model: RankingModel) -> List[Dict[str, Any]]:
+    """Ranked results for the chosen rows, best first; the model explains only these rows."""
+    impacts = model.contributions(feature_matrix(features)[chosen]) if len(chosen) else []
+    return [_ranked(features, i, p, rank, impact) for rank, (i, p, impact) in enumerate(zip(chosen, probability, impacts), start=1)]
+
+def rank_donors(features: DonorFeatures, limit: Optional[int] = None, model: Optional[RankingModel] = None) -> List[Dict[str, Any]]:
+    if features.empty: return []
+    model = model or registry.current()
+    probability = score_features(features, model)
+    order = top_k_order(probability, limit)
+    return _explained(features, order, probability[order], model)
+
+def merge_shards(shards: Sequence[Tuple[DonorFeatures, np.ndarray]], limit: int, model: Optional[RankingModel] = None, top_k: Optional[Callable] = None) -> List[Dict[str, Any]]:
+    """Global ranking of several shards' (features, raw scores), identical to ranking their concatenation.
+
+    Scores are normalised over the bounds of all shards, each shard contributes its own top `limit`, and
+    the candidates are merged best first; ties keep shard order. `top_k` maps over the shards (e.g. a thread pool's map)."""
+    model = model or registry.current()
+    bounds = [b for b in (score_bounds(scores) for _, scores in shards) if b is not None]
+    overall = (min(b[0] for b in bounds), max(b[1] for b in bounds)) if bounds else None
+    def shard_top(shard: Tuple[DonorFeatures, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        probability = probabilities(shard[1], model, overall)
+        order = top_k_order(probability, limit)
+        return order, probability[order]
+    tops = list((top_k or map)(shard_top, shards))
+    candidates = [(k, i, p) for k, (order, probability) in enumerate(tops) for i, p in zip(order, probability)]
+    candidates.sort(key=lambda c: -c[2])  # stable: shard order, then in-shard order
+    ranked = []
+    for k in sorted({k for k, _, _ in candidates[:limit]}):
+        picked = [(rank, i, p) for rank, (kk, i, p) in enumerate(candidates[:limit], start=1) if kk == k]
+        impacts = model.contributions(feature_matrix(shards[k][0])[[i for _, i, _ in picked]])
+        ranked += [(rank, _ranked(shards[k][0], i, p, rank, impact)) for (rank, i, p), impact in zip(picked, impacts)]
+    return [result for _, result in sorted(ranked, key=lambda r: r[0])]
+
+def allocate_donors(features: DonorFeatures, requests: List[Tuple[str, int]], model: Optional[RankingModel] = None) -> List[List[Dict[str, Any]]]:
+    """Assigns up to `units` donors to each (blood type, units) request, never the same donor twice, scoring the pool once.
+
+    Requests that accept the fewest donor types are served first. Within a request, donors that could serve
+    fewer of the still-unserved requests are preferred over higher-scored but more versatile ones, so e.g.
+    O- donors are held back for O- patients while exact-type donors are available. Returns one ranked list per request, in input order."""
+    if features.empty: return [[] for _ in requests]
+    model = model or registry.current()
+    probability = score_features(features, model)
+    donor_type = np.array([BLOOD_TYPE_INDEX[bt] for bt in features.blood_types], dtype=np.int64)
+    available = np.ones(len(features), dtype=bool)
+    recipient = [BLOOD_TYPE_INDEX[bt] for bt, _ in requests]
+    order = sorted(range(len(requests)), key=lambda k: (POPCOUNT[ACCEPTS_MASK[recipient[k]]], k))
+    allocations: List[List[Dict[str, Any]]] = [[] for _ in requests]
+    for position, k in enumerate(order):
+        outstanding = 0
+        for later in order[position + 1:]: outstanding |= 1 << recipient[later]
+        candidates = np.flatnonzero(available & (((ACCEPTS_MASK[recipient[k]] >> donor_type) & 1) == 1))
+        versatility = POPCOUNT[SERVES_MASK[donor_type[candidates]] & outstanding]
+        chosen = candidates[np.lexsort((candidates, -probability[candidates], versatility))][:requests[k][1]]
+        available[chosen] = False
+        allocations[k] = _explained(features, chosen, probability[chosen], model)
+    return allocations
\ No newline at end of file
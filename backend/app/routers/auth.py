@@ -1,59 +1,120 @@
 # backend/app/routers/auth.py
 import os
+import time
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from fastapi import Depends, HTTPException, status, APIRouter
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 try:
-    from .. import models, schemas
+    from .. import metrics, models, schemas
+    from ..database import Database, get_db
 except ImportError:
     import sys
     import os
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    import models, schemas
+    import metrics, models, schemas
+    from database import Database, get_db
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
 if not SECRET_KEY: raise ValueError("SECRET_KEY environment variable is not set")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+LOGIN_MAX_PENDING = int(os.getenv("LOGIN_MAX_PENDING", "64"))
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "30"))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
 
 router = APIRouter(tags=["Authentication"])
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+# bcrypt gets its own small pool so a login storm queues here instead of starving the request threadpool.
+_password_pool = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_pending_logins = 0
 
-def get_db():
-    db = models.SessionLocal(); 
-    try: 
-       yield db
-    finally:
-       db.close()
+@dataclass(frozen=True)
+class HospitalPrincipal:
+    """The authenticated hospital, detached from any session so it can be cached across requests."""
+    id: int
+    email: str
+    name: str
+    location: str
+    city: Optional[str] = None
+
+    @classmethod
+    def from_hospital(cls, hospital: models.Hospital) -> "HospitalPrincipal":
+        return cls(id=hospital.id, email=hospital.email, name=hospital.name, location=hospital.location, city=hospital.city)
+
+class PrincipalCache:
+    """Verified principals keyed by bearer token. An entry lives at most PRINCIPAL_CACHE_TTL_SECONDS and never past
+    the token's own `exp`, which bounds how long a deleted hospital or a changed record can be served stale; nothing in the
+    API changes or deletes hospitals, so entries are never invalidated explicitly."""
+    def __init__(self, ttl_seconds: float = PRINCIPAL_CACHE_TTL_SECONDS, max_entries: int = PRINCIPAL_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds; self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[HospitalPrincipal, float]]" = OrderedDict()
+        self.hits = 0; self.misses = 0
+
+    def get(self, token: str) -> Optional[HospitalPrincipal]:
+        entry = self._entries.get(token)
+        if entry is None or time.time() >= entry[1]:
+            if entry is not None: del self._entries[token]
+            self.misses += 1; metrics.record_cache_lookup("principals", False)
+            return None
+        self._entries.move_to_end(token); self.hits += 1; metrics.record_cache_lookup("principals", True)
+        return entry[0]
+
+    def put(self, token: str, principal: HospitalPrincipal, expires_at: float) -> None:
+        if self.ttl_seconds <= 0: return
+        self._entries[token] = (principal, min(time.time() + self.ttl_seconds, expires_at)); self._entries.move_to_end(token)
+        while len(self._entries) > self.max_entries: self._entries.popitem(last=False)
+
+principal_cache = PrincipalCache()
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    global _pending_logins
+    if _pending_logins >= LOGIN_MAX_PENDING:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Too many login attempts in progress, retry shortly.", headers={"Retry-After": "1"})
+    _pending_logins += 1
+    try: return await asyncio.get_running_loop().run_in_executor(_password_pool, verify_password, plain_password, hashed_password)
+    finally: _pending_logins -= 1
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 def create_access_token(data: dict) -> str:
     to_encode = data.copy(); expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire}); return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def get_current_hospital(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> models.Hospital:
+def _hospital_by_email(db: Session, email: str) -> Optional[models.Hospital]:
+    return db.query(models.Hospital).filter(models.Hospital.email == email).first()
+
+async def get_current_hospital(token: str = Depends(oauth2_scheme), db: Database = Depends(get_db)) -> HospitalPrincipal:
+    principal = principal_cache.get(token)
+    if principal is not None: return principal
     credentials_exception = HTTPException( status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials", headers={"WWW-Authenticate": "Bearer"}, )
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]); email: Optional[str] = payload.get("sub")
+        expires_at = float(payload.get("exp", 0))
         if email is None: raise credentials_exception
         token_data = schemas.TokenData(email=email)
     except JWTError: raise credentials_exception
-    hospital = db.query(models.Hospital).filter(models.Hospital.email == token_data.email).first()
+    hospital = await db.run(_hospital_by_email, token_data.email)
     if hospital is None: raise credentials_exception
-    return hospital
+    principal = HospitalPrincipal.from_hospital(hospital)
+    principal_cache.put(token, principal, expires_at)
+    return principal
 
 @router.post("/token", response_model=schemas.Token)
-def login_for_access_token(db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()):
-    hospital = db.query(models.Hospital).filter(models.Hospital.email == form_data.username).first()
-    if not hospital or not verify_password(form_data.password, hospital.hashed_password):
+async def login_for_access_token(db: Database = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()):
+    hospital = await db.run(_hospital_by_email, form_data.username)
+    with metrics.span("password_verify"): verified = hospital is not None and await verify_password_async(form_data.password, hospital.hashed_password)
+    if not verified:
         raise HTTPException( status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect email or password", headers={"WWW-Authenticate": "Bearer"}, )
     access_token = create_access_token(data={"sub": hospital.email})
     return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
@@ -1,57 +1,318 @@
 # backend/app/routers/donors.py
-from fastapi import APIRouter, Depends, HTTPException, status
+import os
+import csv
+import json
+import base64
+import binascii
+from datetime import datetime
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
+from starlette.concurrency import run_in_threadpool
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from typing import List
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import or_, func, literal, tuple_, exists, select, insert, update
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator, Iterable, Iterator, FrozenSet, Literal, Sequence, Union
 try:
-    from .. import models, schemas, ranking
-    from .auth import get_db, get_current_hospital
+    from .. import metrics, models, schemas, ranking, serialization, sql_ranking, network_search
+    from ..donor_cache import DonorPool, donor_pools, listing_etag, record_batch_status_change, record_new_donor, record_status_change
+    from ..database import Database
+    from .auth import get_db, get_current_hospital, HospitalPrincipal
 except ImportError:
     import sys
     import os
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    import models, schemas, ranking
-    from routers.auth import get_db, get_current_hospital
+    import metrics, models, schemas, ranking, serialization, sql_ranking, network_search
+    from donor_cache import DonorPool, donor_pools, listing_etag, record_batch_status_change, record_new_donor, record_status_change
+    from database import Database
+    from routers.auth import get_db, get_current_hospital, HospitalPrincipal
 
 router = APIRouter(tags=["Donors & Matching"])
+IMPORT_CHUNK_ROWS = int(os.getenv("IMPORT_CHUNK_ROWS", "1000"))
+IMPORT_FORMATS = {"text/csv": "csv", "application/x-ndjson": "jsonl", "application/jsonl": "jsonl", "application/json-lines": "jsonl"}
+BATCH_TRANSITIONS: Dict[str, Tuple[FrozenSet[models.DonorStatus], models.DonorStatus]] = {
+    "approve": (frozenset({models.DonorStatus.PENDING_APPROVAL}), models.DonorStatus.ACTIVE),
+    "decline": (frozenset({models.DonorStatus.PENDING_APPROVAL, models.DonorStatus.ACTIVE}), models.DonorStatus.INACTIVE),
+}
+# A hospital's cached pool, or donors fetched as column rows.
+DonorSource = Union[DonorPool, Sequence[Any]]
 
-@router.post("/donors/register", response_model=schemas.Donor, status_code=status.HTTP_201_CREATED)
-def donor_self_registration(donor: schemas.DonorCreate, db: Session = Depends(get_db)):
-    existing_donor = db.query(models.Donor).filter( or_(models.Donor.email == donor.email, models.Donor.phone == donor.phone) ).first()
-    if existing_donor: raise HTTPException( status_code=status.HTTP_409_CONFLICT, detail="Email or phone already exists." )
-    hospital = db.query(models.Hospital).filter(models.Hospital.id == donor.hospital_id).first()
-    if not hospital: raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Selected hospital does not exist.")
+def _register_donor(db: Session, donor: schemas.DonorCreate) -> models.Donor:
+    duplicate, hospital_exists = db.query(
+        exists().where( or_(models.Donor.email == donor.email, models.Donor.phone == donor.phone) ),
+        exists().where(models.Hospital.id == donor.hospital_id),
+    ).one()
+    if duplicate: raise HTTPException( status_code=status.HTTP_409_CONFLICT, detail="Email or phone already exists." )
+    if not hospital_exists: raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Selected hospital does not exist.")
     db_donor = models.Donor(**donor.model_dump())
     db.add(db_donor); db.commit(); db.refresh(db_donor)
+    record_new_donor(db_donor.hospital_id, db_donor.blood_type, db_donor.status)
     return db_donor
 
-@router.get("/dashboard/donors", response_model=List[schemas.Donor])
-def get_hospital_donors( current_hospital: models.Hospital = Depends(get_current_hospital), db: Session = Depends(get_db) ):
-    return db.query(models.Donor).filter(models.Donor.hospital_id == current_hospital.id).order_by(models.Donor.full_name).all()
+def _encode_cursor(value: Any, donor_id: int) -> str:
+    value = value.isoformat() if isinstance(value, datetime) else value
+    return base64.urlsafe_b64encode(json.dumps([value, donor_id]).encode()).decode()
 
-@router.patch("/dashboard/donors/{donor_id}/approve", response_model=schemas.Donor)
-def approve_donor( donor_id: int, current_hospital: models.Hospital = Depends(get_current_hospital), db: Session = Depends(get_db) ):
+def _decode_cursor(cursor: str, delta: bool) -> Tuple[Any, int]:
+    try:
+        value, donor_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return (datetime.fromisoformat(value) if delta else value), int(donor_id)
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor.")
+
+def _full_listing(db: Session, hospital: HospitalPrincipal, if_none_match: Optional[str]) -> Tuple[Optional[DonorSource], Dict[str, str]]:
+    if donor_pools.enabled:
+        pool = donor_pools.get(db, hospital.id)
+        etag = pool.etag()
+        if if_none_match == etag: return None, {"ETag": etag}
+        return pool, {"ETag": etag}
+    count, last_updated = db.query(func.count(models.Donor.id), func.max(models.Donor.updated_at)).filter(models.Donor.hospital_id == hospital.id).one()
+    etag = listing_etag(hospital.id, count, last_updated)
+    if if_none_match == etag: return None, {"ETag": etag}
+    return db.execute(select(*serialization.DONOR_COLUMNS).where(models.Donor.hospital_id == hospital.id).order_by(models.Donor.full_name)).all(), {"ETag": etag}
+
+def _list_donors(db: Session, hospital: HospitalPrincipal, query: schemas.DonorListQuery, if_none_match: Optional[str]) -> Tuple[Optional[DonorSource], Dict[str, str]]:
+    """Full listing (with ETag), or a filtered keyset page ordered by (full_name, id); in `updated_since` delta
+    mode ordered by (updated_at, id). Returns the cached pool or the fetched column rows (see `_donor_rows`); None for a 304."""
+    if query.is_full_listing(): return _full_listing(db, hospital, if_none_match)
+    Donor = models.Donor
+    q = db.query(*serialization.DONOR_COLUMNS).filter(Donor.hospital_id == hospital.id)
+    if query.status is not None: q = q.filter(Donor.status == query.status)
+    if query.blood_type is not None: q = q.filter(Donor.blood_type == query.blood_type)
+    if query.city is not None: q = q.filter(Donor.city == models.normalize_city(query.city))
+    if query.name_prefix is not None: q = q.filter(Donor.full_name.istartswith(query.name_prefix, autoescape=True))
+    delta = query.updated_since is not None
+    sort_column = Donor.updated_at if delta else Donor.full_name
+    if delta: q = q.filter(Donor.updated_at >= query.updated_since)
+    if query.cursor is not None:
+        value, last_id = _decode_cursor(query.cursor, delta)
+        q = q.filter(tuple_(sort_column, Donor.id) > tuple_(literal(value, sort_column.type), literal(last_id)))
+    q = q.order_by(sort_column, Donor.id)
+    if query.limit is None: return q.all(), {}
+    rows = q.limit(query.limit + 1).all()
+    if len(rows) <= query.limit: return rows, {}
+    rows = rows[:query.limit]; last = rows[-1]
+    return rows, {"X-Next-Cursor": _encode_cursor(last.updated_at if delta else last.full_name, last.id)}
+
+def _donor_rows(source: DonorSource) -> Iterator[Dict[str, Any]]:
+    """Response rows built one at a time, as the response is encoded."""
+    if isinstance(source, DonorPool): return map(source.row, range(len(source)))
+    return map(serialization.donor_row, source)
+
+def _owned_donor(db: Session, donor_id: int, hospital: HospitalPrincipal) -> models.Donor:
     db_donor = db.query(models.Donor).filter(models.Donor.id == donor_id).first()
     if not db_donor: raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Donor not found")
-    if db_donor.hospital_id != current_hospital.id: raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
+    if db_donor.hospital_id != hospital.id: raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
+    return db_donor
+
+def _approve_donor(db: Session, donor_id: int, hospital: HospitalPrincipal) -> models.Donor:
+    db_donor = _owned_donor(db, donor_id, hospital)
     if db_donor.status == models.DonorStatus.PENDING_APPROVAL:
         db_donor.status = models.DonorStatus.ACTIVE; db.commit(); db.refresh(db_donor)
+        record_status_change(hospital.id, db_donor.id, db_donor.blood_type, models.DonorStatus.PENDING_APPROVAL, db_donor.status, db_donor.updated_at)
     return db_donor
 
-@router.patch("/dashboard/donors/{donor_id}/decline", response_model=schemas.Donor)
-def decline_donor( donor_id: int, current_hospital: models.Hospital = Depends(get_current_hospital), db: Session = Depends(get_db) ):
-    db_donor = db.query(models.Donor).filter(models.Donor.id == donor_id).first()
-    if not db_donor: raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Donor not found")
-    if db_donor.hospital_id != current_hospital.id: raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
+def _decline_donor(db: Session, donor_id: int, hospital: HospitalPrincipal) -> models.Donor:
+    db_donor = _owned_donor(db, donor_id, hospital)
     if db_donor.status != models.DonorStatus.INACTIVE:
+        old_status = db_donor.status
         db_donor.status = models.DonorStatus.INACTIVE; db.commit(); db.refresh(db_donor)
+        record_status_change(hospital.id, db_donor.id, db_donor.blood_type, old_status, db_donor.status, db_donor.updated_at)
     return db_donor
 
+def _batch_set_status(db: Session, hospital: HospitalPrincipal, donor_ids: List[int], action: str) -> schemas.BatchStatusResult:
+    """One SELECT to classify the ids and one guarded, set-based UPDATE for the eligible ones."""
+    from_statuses, new_status = BATCH_TRANSITIONS[action]
+    Donor = models.Donor
+    ids = list(dict.fromkeys(donor_ids))
+    found = {row.id: row for row in db.execute(select(Donor.id, Donor.hospital_id, Donor.status).where(Donor.id.in_(ids)))}
+    eligible = [i for i in ids if i in found and found[i].hospital_id == hospital.id and found[i].status in from_statuses]
+    updated_ids = set()
+    if eligible:
+        now = datetime.utcnow()
+        stmt = update(Donor).where(Donor.id.in_(eligible), Donor.hospital_id == hospital.id, Donor.status.in_(from_statuses)).values(status=new_status, updated_at=now).returning(Donor.id)
+        updated_ids = set(db.execute(stmt.execution_options(synchronize_session=False)).scalars()); db.commit()
+        record_batch_status_change(hospital.id, sorted(updated_ids), new_status, now)
+    results = []
+    for i in ids:
+        row = found.get(i)
+        if row is None: results.append(schemas.BatchItemResult(donor_id=i, ok=False, detail="Donor not found"))
+        elif row.hospital_id != hospital.id: results.append(schemas.BatchItemResult(donor_id=i, ok=False, detail="Not authorized"))
+        elif i in updated_ids: results.append(schemas.BatchItemResult(donor_id=i, ok=True, status=new_status))
+        elif row.status in from_statuses: results.append(schemas.BatchItemResult(donor_id=i, ok=False, detail="Donor was modified concurrently, retry"))
+        else: results.append(schemas.BatchItemResult(donor_id=i, ok=True, status=row.status))
+    return schemas.BatchStatusResult(updated=len(updated_ids), results=results)
+
+async def _import_lines(request: Request) -> AsyncIterator[Tuple[int, str]]:
+    """Numbered, non-blank lines of the request body, decoded as they stream in."""
+    buffer = b""; line_no = 0
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for raw in lines:
+            line_no += 1
+            line = raw.decode("utf-8", errors="replace").rstrip("\r").lstrip("\ufeff") if line_no == 1 else raw.decode("utf-8", errors="replace").rstrip("\r")
+            if line.strip(): yield line_no, line
+    if buffer.strip(): yield line_no + 1, buffer.decode("utf-8", errors="replace").rstrip("\r").lstrip("\ufeff")
+
+async def _import_records(request: Request, fmt: str) -> AsyncIterator[Tuple[int, Any]]:
+    """(line, payload) pairs; payload is a dict, or an error message for an unparseable line. CSV takes one record per line after a header row."""
+    header: Optional[List[str]] = None
+    async for line_no, line in _import_lines(request):
+        if fmt == "jsonl":
+            try: payload = json.loads(line)
+            except ValueError as e: yield line_no, f"Invalid JSON: {e}"; continue
+            yield line_no, payload if isinstance(payload, dict) else "Expected a JSON object"
+            continue
+        values = next(csv.reader([line]))
+        if header is None: header = [h.strip() for h in values]; continue
+        if len(values) != len(header): yield line_no, f"Expected {len(header)} fields, got {len(values)}"; continue
+        yield line_no, {k: v.strip() for k, v in zip(header, values) if v.strip() != ""}
+
+def _validation_detail(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in error.errors())
+
+def _validate_chunk(hospital: HospitalPrincipal, records: Iterable[Tuple[int, Any]]) -> Tuple[Dict[int, schemas.ImportRowResult], List[Tuple[int, Dict[str, Any]]]]:
+    """Failed lines' results, and the insert values of the valid rows."""
+    results: Dict[int, schemas.ImportRowResult] = {}; rows: List[Tuple[int, Dict[str, Any]]] = []
+    for line, payload in records:
+        if isinstance(payload, str): results[line] = schemas.ImportRowResult(line=line, ok=False, detail=payload); continue
+        try: row = schemas.DonorImportRow.model_validate(payload)
+        except ValidationError as e: results[line] = schemas.ImportRowResult(line=line, ok=False, detail=_validation_detail(e)); continue
+        rows.append((line, {**row.model_dump(), "hospital_id": hospital.id, **models.location_fields(row.location)}))
+    return results, rows
+
+def _insert_chunk(db: Session, hospital: HospitalPrincipal, results: Dict[int, schemas.ImportRowResult], rows: List[Tuple[int, Dict[str, Any]]]) -> List[schemas.ImportRowResult]:
+    """Checks email/phone uniqueness against the table in one query and inserts the rest in one statement."""
+    Donor = models.Donor
+    taken_emails, taken_phones = set(), set()
+    if rows:
+        for email, phone in db.execute(select(Donor.email, Donor.phone).where(or_(Donor.email.in_({r["email"] for _, r in rows}), Donor.phone.in_({r["phone"] for _, r in rows})))):
+            taken_emails.add(email); taken_phones.add(phone)
+    pending: List[Tuple[int, Dict[str, Any]]] = []
+    for line, values in rows:
+        if values["email"] in taken_emails or values["phone"] in taken_phones:
+            results[line] = schemas.ImportRowResult(line=line, ok=False, detail="Email or phone already exists."); continue
+        taken_emails.add(values["email"]); taken_phones.add(values["phone"])
+        pending.append((line, values))
+    if pending:
+        try:
+            ids = db.execute(insert(Donor).returning(Donor.id, sort_by_parameter_order=True), [values for _, values in pending]).scalars().all()
+            db.commit()
+            created = list(zip(pending, ids))
+        except IntegrityError:
+            # Lost a race with a concurrent insert: fall back to one savepoint per row to find the offenders.
+            db.rollback(); created = []
+            for line, values in pending:
+                try:
+                    with db.begin_nested(): created.append(((line, values), db.execute(insert(Donor).returning(Donor.id), values).scalar_one()))
+                except IntegrityError: results[line] = schemas.ImportRowResult(line=line, ok=False, detail="Email or phone already exists.")
+            db.commit()
+        for (line, values), donor_id in created:
+            results[line] = schemas.ImportRowResult(line=line, ok=True, donor_id=donor_id)
+            record_new_donor(hospital.id, values["blood_type"], values["status"])
+    return [results[line] for line in sorted(results)]
+
+async def _import_chunk(db: Database, hospital: HospitalPrincipal, records: Iterable[Tuple[int, Any]]) -> List[schemas.ImportRowResult]:
+    results, rows = await run_in_threadpool(_validate_chunk, hospital, records)
+    return await db.run(_insert_chunk, hospital, results, rows)
+
+def _candidates(db: Session, hospital: HospitalPrincipal, compatible_types: List[str], radius_km: Optional[float] = None) -> DonorSource:
+    """The hospital's cached donor pool or, with caching disabled, its active compatible donors (within the
+    radius' prefilter, when one is given) as column rows."""
+    if donor_pools.enabled: return donor_pools.get(db, hospital.id)
+    Donor = models.Donor
+    conditions = [Donor.hospital_id == hospital.id, Donor.blood_type.in_(compatible_types), Donor.status == models.DonorStatus.ACTIVE]
+    within = sql_ranking.location_terms(Donor, ranking.Origin.at(hospital.location), radius_km)[2]
+    if within is not None: conditions.append(within)
+    with metrics.span("db_fetch"):
+        result = db.execute(select(*serialization.DONOR_COLUMNS, Donor.city, Donor.latitude, Donor.longitude).where(*conditions))
+    with metrics.span("hydration"): return result.all()
+
+def _candidate_features(candidates: DonorSource, hospital: HospitalPrincipal, compatible_types: List[str], radius_km: Optional[float] = None) -> ranking.DonorFeatures:
+    with metrics.span("calculate_features"):
+        if isinstance(candidates, DonorPool): return candidates.features(compatible_types, hospital.location, radius_km)
+        return ranking.calculate_features(candidates, hospital.location, radius_km)
+
+def _batch_needs(request: schemas.BatchMatchRequest) -> Tuple[List[Tuple[str, int]], List[str]]:
+    needed = [(r.blood_type_needed.value, r.units) for r in request.requests]
+    return needed, sorted({t for bt, _ in needed for t in ranking.get_compatible_types(bt)})
+
+def _allocate(candidates: DonorSource, request: schemas.BatchMatchRequest, hospital: HospitalPrincipal) -> List[Dict[str, Any]]:
+    needed, compatible_types = _batch_needs(request)
+    features = _candidate_features(candidates, hospital, compatible_types, request.radius_km)
+    with metrics.span("allocate_donors"): allocations = ranking.allocate_donors(features, needed)
+    return [ { "blood_type_needed": bt, "units_requested": units, "units_allocated": len(donors), "donors": [serialization.ranked_row(d) for d in donors], } for (bt, units), donors in zip(needed, allocations) ]
+
+def _uses_sql_engine(request: schemas.MatchRequest) -> bool:
+    # The SQL ranker implements the heuristic only; a learned model always scores in Python.
+    return (request.engine or ranking.RANKING_ENGINE) == "sql" and ranking.registry.current() is ranking.HEURISTIC
+
+def _fetch_sql_ranking(db: Session, request: schemas.MatchRequest, hospital: HospitalPrincipal, compatible_types: List[str]) -> List[Any]:
+    with metrics.span("rank_donors_sql"): return db.execute(sql_ranking.ranked_query(hospital.id, hospital.location, compatible_types, limit=request.limit, radius_km=request.radius_km)).all()
+
+def _rank(candidates: DonorSource, request: schemas.MatchRequest, hospital: HospitalPrincipal, compatible_types: List[str]) -> List[Dict[str, Any]]:
+    features = _candidate_features(candidates, hospital, compatible_types, request.radius_km)
+    with metrics.span("rank_donors"): ranked = ranking.rank_donors(features, limit=request.limit)
+    return [serialization.ranked_row(r) for r in ranked]
+
+@router.post("/donors/register", response_model=schemas.Donor, status_code=status.HTTP_201_CREATED)
+async def donor_self_registration(donor: schemas.DonorCreate, db: Database = Depends(get_db)):
+    return await db.run(_register_donor, donor)
+
+@router.get("/dashboard/donors", response_model=List[schemas.Donor])
+async def get_hospital_donors( http_request: Request, query: schemas.DonorListQuery = Depends(), if_none_match: Optional[str] = Header(default=None), current_hospital: HospitalPrincipal = Depends(get_current_hospital), db: Database = Depends(get_db) ):
+    """Lists the hospital's donors: all of them, with an ETag (304 for a matching If-None-Match), or a page
+    filtered by status, blood type, city or name prefix, or changed since `updated_since`, whose next page
+    is named by the X-Next-Cursor header."""
+    source, headers = await db.run(_list_donors, current_hospital, query, if_none_match)
+    if source is None: return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return await serialization.list_response(http_request, _donor_rows(source), headers)
+
+@router.patch("/dashboard/donors/{donor_id}/approve", response_model=schemas.Donor)
+async def approve_donor( donor_id: int, current_hospital: HospitalPrincipal = Depends(get_current_hospital), db: Database = Depends(get_db) ):
+    return await db.run(_approve_donor, donor_id, current_hospital)
+
+@router.patch("/dashboard/donors/{donor_id}/decline", response_model=schemas.Donor)
+async def decline_donor( donor_id: int, current_hospital: HospitalPrincipal = Depends(get_current_hospital), db: Database = Depends(get_db) ):
+    return await db.run(_decline_donor, donor_id, current_hospital)
+
+@router.post("/dashboard/find-matches/batch", response_model=List[schemas.MatchAllocation])
+async def find_matches_batch( http_request: Request, request: schemas.BatchMatchRequest, current_hospital: HospitalPrincipal = Depends(get_current_hospital), db: Database = Depends(get_db) ):
+    """Allocates donors to several blood requests at once from a single load and scoring of the compatible pool."""
+    candidates = await db.run(_candidates, current_hospital, _batch_needs(request)[1], request.radius_km)
+    return await serialization.list_response(http_request, await run_in_threadpool(_allocate, candidates, request, current_hospital))
+
+@router.post("/dashboard/donors/batch/{action}", response_model=schemas.BatchStatusResult)
+async def batch_update_donor_status( action: Literal["approve", "decline"], request: schemas.BatchStatusRequest, current_hospital: HospitalPrincipal = Depends(get_current_hospital), db: Database = Depends(get_db) ):
+    """Approves or declines many donors in one transaction; per-donor outcomes are reported instead of failing the batch."""
+    return await db.run(_batch_set_status, current_hospital, request.donor_ids, action)
+
+@router.post("/dashboard/donors/import", response_model=schemas.ImportResult)
+async def import_donors( request: Request, current_hospital: HospitalPrincipal = Depends(get_current_hospital), db: Database = Depends(get_db) ):
+    """Streams a CSV (text/csv, header row first) or JSON Lines (application/x-ndjson) body of donors into the
+    hospital, IMPORT_CHUNK_ROWS at a time. Invalid or duplicate rows are reported per line and skipped."""
+    fmt = IMPORT_FORMATS.get(request.headers.get("content-type", "").split(";")[0].strip().lower())
+    if fmt is None: raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=f"Send one of: {', '.join(IMPORT_FORMATS)}")
+    results: List[schemas.ImportRowResult] = []; chunk: List[Tuple[int, Any]] = []
+    async for record in _import_records(request, fmt):
+        chunk.append(record)
+        if len(chunk) >= IMPORT_CHUNK_ROWS: results += await _import_chunk(db, current_hospital, chunk); chunk = []
+    if chunk: results += await _import_chunk(db, current_hospital, chunk)
+    created = sum(r.ok for r in results)
+    return schemas.ImportResult(created=created, failed=len(results) - created, results=results)
+
 @router.post("/dashboard/find-matches", response_model=List[schemas.RankedDonor])
-def find_and_rank_donors( request: schemas.MatchRequest, current_hospital: models.Hospital = Depends(get_current_hospital), db: Session = Depends(get_db) ):
+async def find_and_rank_donors( http_request: Request, request: schemas.MatchRequest, current_hospital: HospitalPrincipal = Depends(get_current_hospital), db: Database = Depends(get_db) ):
+    """Ranks the active donors compatible with the requested blood type, best first: the hospital's own or, with
+    `scope` "network", every hospital's. `limit` and `radius_km` narrow the result."""
     compatible_types = ranking.get_compatible_types(request.blood_type_needed.value)
-    potential_donors = db.query(models.Donor).filter( models.Donor.hospital_id == current_hospital.id, models.Donor.blood_type.in_(compatible_types), models.Donor.status == models.DonorStatus.ACTIVE ).all()
-    if not potential_donors: return []
-    features_df = ranking.calculate_features(potential_donors, current_hospital.location)
-    if features_df.empty: return []
-    return ranking.rank_donors(features_df)
\ No newline at end of file
+    if request.scope == "network":
+        # Network search opens a session per shard instead of using the request's.
+        ranked = await run_in_threadpool(network_search.rank_network, current_hospital.location, compatible_types, limit=request.limit, radius_km=request.radius_km)
+    elif _uses_sql_engine(request):
+        rows = await db.run(_fetch_sql_ranking, request, current_hospital, compatible_types)
+        ranked = await run_in_threadpool(sql_ranking.ranked_rows, rows)
+    else:
+        candidates = await db.run(_candidates, current_hospital, compatible_types, request.radius_km)
+        ranked = await run_in_threadpool(_rank, candidates, request, current_hospital, compatible_types)
+    return await serialization.list_response(http_request, ranked)
\ No newline at end of file
@@ -1,29 +1,35 @@
 # backend/app/routers/hospitals.py
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from typing import List, Dict, Any
 try:
     from .. import models, schemas
-    from .auth import get_db, get_current_hospital
+    from ..donor_cache import donor_counts
+    from ..database import Database
+    from .auth import get_db, get_current_hospital, HospitalPrincipal
 except ImportError:
     import sys
     import os
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     import models, schemas
-    from routers.auth import get_db, get_current_hospital
+    from donor_cache import donor_counts
+    from database import Database
+    from routers.auth import get_db, get_current_hospital, HospitalPrincipal
 
 router = APIRouter(prefix="/hospitals", tags=["Hospitals"])
 
+def _all_hospitals(db: Session) -> List[models.Hospital]:
+    return db.query(models.Hospital).order_by(models.Hospital.name).all()
+
+def _hospital_stats(db: Session, current_hospital: HospitalPrincipal, breakdown: bool) -> Dict[str, Any]:
+    return donor_counts.get(db, current_hospital.id).summary(breakdown)
+
 @router.get("/", response_model=List[schemas.Hospital])
-def get_all_hospitals(db: Session = Depends(get_db)):
+async def get_all_hospitals(db: Database = Depends(get_db)):
     """Public endpoint to get a list of hospitals for the registration form."""
-    return db.query(models.Hospital).order_by(models.Hospital.name).all()
+    return await db.run(_all_hospitals)
 
 @router.get("/dashboard/stats", response_model=Dict[str, Any])
-def get_hospital_stats( current_hospital: models.Hospital = Depends(get_current_hospital), db: Session = Depends(get_db) ):
-    """Returns key statistics for the logged-in hospital's dashboard."""
-    total_donors = db.query(func.count(models.Donor.id)).filter(models.Donor.hospital_id == current_hospital.id).scalar()
-    active_donors = db.query(func.count(models.Donor.id)).filter( models.Donor.hospital_id == current_hospital.id, models.Donor.status == models.DonorStatus.ACTIVE ).scalar()
-    pending_donors = db.query(func.count(models.Donor.id)).filter( models.Donor.hospital_id == current_hospital.id, models.Donor.status == models.DonorStatus.PENDING_APPROVAL ).scalar()
-    return { "total_donors": total_donors or 0, "active_donors": active_donors or 0, "pending_donors": pending_donors or 0, }
\ No newline at end of file
+async def get_hospital_stats( breakdown: bool = Query(False, description="Include donor counts per blood type and status."), current_hospital: HospitalPrincipal = Depends(get_current_hospital), db: Database = Depends(get_db) ):
+    """Returns key statistics for the logged-in hospital's dashboard, from one grouped COUNT query (or the opt-in per-hospital counters)."""
+    return await db.run(_hospital_stats, current_hospital, breakdown)
\ No newline at end of file
@@ -1,6 +1,6 @@
 # backend/app/schemas.py
 from pydantic import BaseModel, EmailStr, Field
-from typing import List, Optional
+from typing import List, Optional, Literal
 from datetime import datetime
 try:
     from .models import BloodType, DonorStatus
@@ -27,9 +27,51 @@ class Donor(DonorBase):
     reliability_score: float
     last_donation_date: Optional[datetime] = None
     fatigue_level: float
+    updated_at: Optional[datetime] = None
     class Config:
         from_attributes = True
 
+class DonorListQuery(BaseModel):
+    """Query parameters of GET /dashboard/donors. Without any of them the full list is returned."""
+    status: Optional[DonorStatus] = None
+    blood_type: Optional[BloodType] = None
+    city: Optional[str] = None
+    name_prefix: Optional[str] = Field(default=None, min_length=1)
+    updated_since: Optional[datetime] = Field(default=None, description="Only donors changed at or after this time (the largest `updated_at` seen so far), oldest change first.")
+    cursor: Optional[str] = Field(default=None, description="`X-Next-Cursor` header of the previous page.")
+    limit: Optional[int] = Field(default=None, ge=1, le=1000)
+
+    def is_full_listing(self) -> bool:
+        return all(v is None for v in self.model_dump().values())
+
+class DonorImportRow(DonorBase):
+    status: DonorStatus = DonorStatus.PENDING_APPROVAL
+    last_donation_date: Optional[datetime] = None
+
+class BatchStatusRequest(BaseModel):
+    donor_ids: List[int] = Field(min_length=1, max_length=5000)
+
+class BatchItemResult(BaseModel):
+    donor_id: int
+    ok: bool
+    status: Optional[DonorStatus] = None
+    detail: Optional[str] = None
+
+class BatchStatusResult(BaseModel):
+    updated: int
+    results: List[BatchItemResult]
+
+class ImportRowResult(BaseModel):
+    line: int
+    ok: bool
+    donor_id: Optional[int] = None
+    detail: Optional[str] = None
+
+class ImportResult(BaseModel):
+    created: int
+    failed: int
+    results: List[ImportRowResult]
+
 class HospitalBase(BaseModel):
     name: str
     email: EmailStr
@@ -42,6 +84,10 @@ class Hospital(HospitalBase):
 
 class MatchRequest(BaseModel):
     blood_type_needed: BloodType
+    limit: Optional[int] = Field(default=None, ge=1, description="Return only the top-N ranked donors.")
+    engine: Optional[Literal["python", "sql"]] = Field(default=None, description="Override the RANKING_ENGINE setting for this request.")
+    radius_km: Optional[float] = Field(default=None, gt=0, le=5000, description="Only consider donors within this distance of the hospital.")
+    scope: Literal["hospital", "network"] = Field(default="hospital", description="'network' searches the donors of every hospital; `engine` is ignored and `limit` defaults to NETWORK_SEARCH_DEFAULT_LIMIT.")
 
 class MatchExplanation(BaseModel):
     feature: str
@@ -55,6 +101,20 @@ class RankedDonor(BaseModel):
     explanation_human: str
     explanation_shap: Optional[List[MatchExplanation]] = None
 
+class BloodRequest(BaseModel):
+    blood_type_needed: BloodType
+    units: int = Field(default=1, ge=1, le=500)
+
+class BatchMatchRequest(BaseModel):
+    requests: List[BloodRequest] = Field(min_length=1, max_length=50)
+    radius_km: Optional[float] = Field(default=None, gt=0, le=5000, description="Only consider donors within this distance of the hospital.")
+
+class MatchAllocation(BaseModel):
+    blood_type_needed: BloodType
+    units_requested: int
+    units_allocated: int
+    donors: List[RankedDonor]
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -1,17 +1,40 @@
 # backend/app/seed.py
-import random
+"""Deterministic synthetic data: hospitals and donors generated column-wise with NumPy from one seed.
+
+`python seed.py` (from app/) creates the demo data set, 5 hospitals and 1,000 donors; `--donors` and
+`--hospitals` scale it up to millions. Donors are written in chunks: COPY on PostgreSQL (psycopg2),
+one prepared executemany on SQLite, SQLAlchemy Core executemany elsewhere. Emails and phones are
+derived from each donor's sequence number, so they never collide and no uniqueness checks are
+needed; a rerun appends donors after the existing ones. The same seed on an empty database yields
+the same rows: donation dates are relative to `--now` and `updated_at` is `--now` itself (naive UTC,
+like the app's own timestamps; defaults to the current time).
+"""
+import io
+import csv
+import time
+import argparse
 import numpy as np
 from faker import Faker
-from datetime import datetime, timedelta
-from models import SessionLocal, Hospital, Donor, BloodType, DonorStatus, Base, engine, create_db_tables
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from routers.auth import get_password_hash
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+from sqlalchemy import func, insert, select
+from sqlalchemy.engine import Connection
+try:
+    from .models import SessionLocal, Hospital, Donor, BloodType, DonorStatus, engine, create_db_tables, location_fields
+    from .routers.auth import get_password_hash
+except ImportError:
+    import sys
+    import os
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    from models import SessionLocal, Hospital, Donor, BloodType, DonorStatus, engine, create_db_tables, location_fields
+    from routers.auth import get_password_hash
 
 NUM_OTHER_HOSPITALS = 4
 DONORS_PER_HOSPITAL = 200
 TOTAL_DONORS = (1 + NUM_OTHER_HOSPITALS) * DONORS_PER_HOSPITAL
+DEFAULT_SEED = 42
+CHUNK_ROWS = 50_000
+NAME_POOL_SIZE = 400
 
 BLOOD_TYPE_DISTRIBUTION = [ (BloodType.OP, 0.345), (BloodType.BP, 0.32), (BloodType.AP, 0.22), (BloodType.ABP, 0.07), (BloodType.ON, 0.02), (BloodType.AN, 0.01), (BloodType.BN, 0.01), (BloodType.ABN, 0.005), ]
 BLOOD_TYPES = [val[0].value for val in BLOOD_TYPE_DISTRIBUTION]
@@ -23,53 +46,114 @@ STATUS_PROBS = [val[1] for val in STATUS_DISTRIBUTION]
 
 LOCATIONS = [ "Mangalore, Karnataka", "Udupi, Karnataka", "Bangalore, Karnataka", "Mysore, Karnataka", "Mumbai, Maharashtra", "Pune, Maharashtra", "Delhi, Delhi", "Chennai, Tamil Nadu", "Hyderabad, Telangana", "Kolkata, West Bengal", "Ahmedabad, Gujarat", "Jaipur, Rajasthan", "Kochi, Kerala", "Thiruvananthapuram, Kerala", "Goa", "Surat, Gujarat", ]
 
-def seed_database():
-    print(f"Starting database seed...")
-    fake = Faker('en_IN')
+YENEPOYA_EMAIL = "admin_yenepoya@hospital.com"
+# Raw INSERT column order; bulk writes bypass the ORM, so the location-derived columns are filled here.
+DONOR_COLUMNS = ( "full_name", "email", "phone", "blood_type", "location", "city", "latitude", "longitude", "geo_cell", "last_donation_date", "reliability_score", "fatigue_level", "status", "hospital_id", "updated_at", )
+
+def name_pools(seed: int, size: int = NAME_POOL_SIZE) -> Dict[str, List[str]]:
+    """Fixed pools of first and last names drawn once from a seeded Faker."""
+    fake = Faker('en_IN'); fake.seed_instance(seed)
+    return {"first": sorted({fake.first_name() for _ in range(size)}), "last": sorted({fake.last_name() for _ in range(size)})}
+
+def ensure_hospitals(db, count: int, rng: np.random.Generator) -> List[Hospital]:
+    """Yenepoya plus `count - 1` numbered hospitals, creating the missing ones; each password is hashed once."""
+    emails = [YENEPOYA_EMAIL] + [f"admin{i+1}@hospital.com" for i in range(count - 1)]
+    locations = ["Mangalore, Karnataka"] + [LOCATIONS[i] for i in rng.integers(len(LOCATIONS), size=count - 1)]
+    existing = {h.email: h for h in db.query(Hospital).filter(Hospital.email.in_(emails))}
+    hashes: Dict[str, str] = {}; created = 0
+    for i, (email, location) in enumerate(zip(emails, locations)):
+        if email in existing: continue
+        password = "yenepoya123" if i == 0 else "admin123"
+        if password not in hashes: hashes[password] = get_password_hash(password)
+        name = "Yenepoya Hospital" if i == 0 else f"{location.split(',')[0]} City Hospital {i}"
+        existing[email] = Hospital(name=name, email=email, hashed_password=hashes[password], location=location)
+        db.add(existing[email]); created += 1
+    if created:
+        db.commit(); print(f"Created {created} hospital(s).")
+    return [existing[email] for email in emails]
+
+def _timestamps(values: np.ndarray) -> List[Optional[str]]:
+    """datetime64 values as the 'YYYY-MM-DD HH:MM:SS.ffffff' text both SQLite and PostgreSQL accept; NaT becomes None."""
+    text = np.char.replace(np.datetime_as_string(values, unit="us"), "T", " ")
+    return [None if missing else t for t, missing in zip(text.tolist(), np.isnat(values).tolist())]
+
+def generate_donors(rng: np.random.Generator, start: int, count: int, hospital_ids: Sequence[int], names: Dict[str, List[str]], now: datetime) -> Dict[str, List[Any]]:
+    """`count` donors numbered from `start`, as columns named like DONOR_COLUMNS. Enum columns hold member names, as stored."""
+    seq = np.arange(start, start + count)
+    first = np.array(names["first"], dtype=object)[rng.integers(len(names["first"]), size=count)]
+    last = np.array(names["last"], dtype=object)[rng.integers(len(names["last"]), size=count)]
+    location_idx = rng.integers(len(LOCATIONS), size=count)
+    located = [location_fields(loc) for loc in LOCATIONS]
+    has_donated = rng.random(count) < 0.75
+    days_ago = rng.integers(30, 701, size=count)
+    last_donation = np.where(has_donated, np.datetime64(now, "us") - days_ago.astype("timedelta64[D]"), np.datetime64("NaT"))
+    return {
+        "full_name": [f"{a} {b}" for a, b in zip(first, last)],
+        "email": [f"{a.lower()}.{b.lower()}.{i}@example.com".replace(" ", "") for a, b, i in zip(first, last, seq.tolist())],
+        "phone": [f"+91-555-{i:07d}" for i in seq.tolist()],
+        "blood_type": [BloodType(BLOOD_TYPES[i]).name for i in rng.choice(len(BLOOD_TYPES), size=count, p=BLOOD_PROBS)],
+        "location": [LOCATIONS[i] for i in location_idx],
+        "city": [located[i]["city"] for i in location_idx],
+        "latitude": [located[i]["latitude"] for i in location_idx],
+        "longitude": [located[i]["longitude"] for i in location_idx],
+        "geo_cell": [located[i]["geo_cell"] for i in location_idx],
+        "last_donation_date": _timestamps(last_donation),
+        "reliability_score": rng.uniform(0.5, 1.0, size=count).tolist(),
+        "fatigue_level": rng.uniform(0.0, 0.8, size=count).tolist(),
+        "status": [DonorStatus(STATUS_TYPES[i]).name for i in rng.choice(len(STATUS_TYPES), size=count, p=STATUS_PROBS)],
+        "hospital_id": [int(hospital_ids[i]) for i in rng.integers(len(hospital_ids), size=count)],
+        "updated_at": _timestamps(np.full(count, np.datetime64(now, "us"))),
+    }
+
+def write_donors(conn: Connection, columns: Dict[str, List[Any]]) -> None:
+    rows = list(zip(*(columns[c] for c in DONOR_COLUMNS)))
+    if conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg2":
+        buffer = io.StringIO(); csv.writer(buffer).writerows(rows); buffer.seek(0)
+        with conn.connection.dbapi_connection.cursor() as cursor:
+            cursor.copy_expert(f"COPY donors ({', '.join(DONOR_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    elif conn.dialect.name == "sqlite":
+        conn.exec_driver_sql(f"INSERT INTO donors ({', '.join(DONOR_COLUMNS)}) VALUES ({', '.join('?' * len(DONOR_COLUMNS))})", rows)
+    else:
+        # Core insert: the Enum and DateTime column types expect members and datetimes rather than stored text.
+        values = [dict(zip(DONOR_COLUMNS, row)) for row in rows]
+        for v in values:
+            v["blood_type"] = BloodType[v["blood_type"]]; v["status"] = DonorStatus[v["status"]]
+            v["last_donation_date"] = v["last_donation_date"] and datetime.fromisoformat(v["last_donation_date"]); v["updated_at"] = datetime.fromisoformat(v["updated_at"])
+        conn.execute(insert(Donor.__table__), values)
+
+def seed_database(donors: int = TOTAL_DONORS, hospitals: int = 1 + NUM_OTHER_HOSPITALS, seed: int = DEFAULT_SEED, chunk_rows: int = CHUNK_ROWS, now: Optional[datetime] = None) -> int:
+    """Adds `donors` donors spread over `hospitals` hospitals. Returns the number of donors added."""
+    print(f"Starting database seed (seed={seed})...")
     create_db_tables()
+    rng = np.random.default_rng(seed); now = now or datetime.utcnow()
     db = SessionLocal()
-    hospitals = []; created_count = 0
-    yenepoya_email = "admin_yenepoya@hospital.com"
-    yenepoya = db.query(Hospital).filter(Hospital.email == yenepoya_email).first()
-    if not yenepoya:
-        yenepoya = Hospital( name="Yenepoya Hospital", email=yenepoya_email, hashed_password=get_password_hash("yenepoya123"), location="Mangalore, Karnataka" )
-        db.add(yenepoya); created_count += 1; print(f"Created hospital: {yenepoya.name}")
-    hospitals.append(yenepoya)
-    for i in range(NUM_OTHER_HOSPITALS):
-        email = f"admin{i+1}@hospital.com"
-        hospital = db.query(Hospital).filter(Hospital.email == email).first()
-        if not hospital:
-            city_state = random.choice(LOCATIONS); hospital_name = f"{city_state.split(',')[0]} City Hospital {i+1}"
-            hospital = Hospital( name=hospital_name, email=email, hashed_password=get_password_hash("admin123"), location=city_state )
-            db.add(hospital); created_count += 1; print(f"Created hospital: {hospital.name}")
-        hospitals.append(hospital)
-    if created_count > 0: db.commit()
-    for h in hospitals: db.refresh(h)
-    print(f"Total hospitals in DB: {len(hospitals)}. Login for Yenepoya: {yenepoya_email} / yenepoya123")
-    print(f"Generating {TOTAL_DONORS} donors...")
-    existing_emails = {d[0] for d in db.query(Donor.email).all()}
-    existing_phones = {d[0] for d in db.query(Donor.phone).all()}
-    donors_to_add = []; added_count = 0
-    while added_count < TOTAL_DONORS:
-        first_name = fake.first_name(); last_name = fake.last_name()
-        email = f"{first_name.lower()}.{last_name.lower()}{random.randint(100,999)}@test.com"
-        phone = fake.phone_number()
-        if email in existing_emails or phone in existing_phones: continue
-        hospital = random.choice(hospitals)
-        blood_type_str = np.random.choice(BLOOD_TYPES, p=BLOOD_PROBS)
-        status_str = np.random.choice(STATUS_TYPES, p=STATUS_PROBS)
-        location = random.choice(LOCATIONS); last_donation = None
-        if random.random() < 0.75: days_ago = random.randint(30, 700); last_donation = datetime.now() - timedelta(days=days_ago)
-        reliability = random.uniform(0.5, 1.0); fatigue = random.uniform(0.0, 0.8)
-        donors_to_add.append( Donor( full_name=f"{first_name} {last_name}", email=email, phone=phone, blood_type=blood_type_str, location=location, last_donation_date=last_donation, reliability_score=reliability, fatigue_level=fatigue, status=status_str, hospital_id=hospital.id ) )
-        existing_emails.add(email); existing_phones.add(phone); added_count += 1
-        if added_count % 100 == 0: print(f"Generated {added_count}/{TOTAL_DONORS} donors...")
-    if donors_to_add:
-        db.bulk_save_objects(donors_to_add); db.commit()
-        print(f"Successfully added {len(donors_to_add)} new donors.")
-    else: print("No new donors to add.")
-    print("Database seeding complete. ✅")
-    db.close()
+    try:
+        hospital_rows = ensure_hospitals(db, hospitals, rng)
+        hospital_ids = [h.id for h in hospital_rows]
+        start = db.scalar(select(func.count(Donor.id)))
+    finally:
+        db.close()
+    print(f"Total hospitals: {len(hospital_ids)}. Login for Yenepoya: {YENEPOYA_EMAIL} / yenepoya123")
+    names = name_pools(seed)
+    started = time.perf_counter(); written = 0
+    while written < donors:
+        count = min(chunk_rows, donors - written)
+        columns = generate_donors(rng, start + written, count, hospital_ids, names, now)
+        with engine.begin() as conn: write_donors(conn, columns)
+        written += count
+        print(f"Wrote {written}/{donors} donors ({written / (time.perf_counter() - started):,.0f} rows/s)...")
+    print(f"Database seeding complete: {written} donors in {time.perf_counter() - started:.1f}s. ✅")
+    return written
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Seed the database with deterministic synthetic hospitals and donors.")
+    parser.add_argument("--donors", type=int, default=TOTAL_DONORS, help="donors to add (default: %(default)s)")
+    parser.add_argument("--hospitals", type=int, default=1 + NUM_OTHER_HOSPITALS, help="hospitals to spread donors over, Yenepoya included (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="random seed (default: %(default)s)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="rows generated and written per transaction (default: %(default)s)")
+    parser.add_argument("--now", type=datetime.fromisoformat, default=None, help="reference time for donation dates and updated_at, naive UTC in ISO format (default: now)")
+    args = parser.parse_args(argv)
+    seed_database(args.donors, args.hospitals, args.seed, args.chunk_rows, args.now)
 
 if __name__ == "__main__":
-    seed_database()
\ No newline at end of file
+    main()
@@ -0,0 +1,61 @@
+# backend/app/serialization.py
+"""Fast JSON for the large list endpoints (find-matches and the dashboard donor list).
+
+Their results are built as plain rows in the shape of the response schema: donors come from cached
+pools or column queries rather than ORM objects, and explanations are dicts. Such rows need no second
+validation pass against the `response_model`, so the routes encode them with orjson and return the
+response directly; the `response_model` still documents the schema, and the JSON is the same.
+Encoding runs in the threadpool, never on the event loop. See `list_response` for NDJSON.
+"""
+import os
+import orjson
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, Mapping, Optional
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+try:
+    from . import metrics, models, schemas
+except ImportError:
+    import sys
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    import metrics, models, schemas
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NDJSON_CHUNK_ROWS = int(os.getenv("NDJSON_CHUNK_ROWS", "1000"))
+
+# `schemas.Donor` fields, in its order, and the columns to select them with.
+DONOR_FIELDS = tuple(schemas.Donor.model_fields)
+DONOR_COLUMNS = tuple(getattr(models.Donor, f) for f in DONOR_FIELDS)
+
+def dumps(content: Any) -> bytes:
+    # Enums encode as their values, naive datetimes as ISO 8601 and NaN as null, like pydantic's dump_json.
+    return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+
+def donor_row(donor: Any) -> Dict[str, Any]:
+    """A donor as a `schemas.Donor`-shaped dict, from a pool row (already one), a column query row or an ORM object."""
+    if isinstance(donor, dict): return donor
+    return {f: getattr(donor, f) for f in DONOR_FIELDS}
+
+def ranked_row(ranked: Dict[str, Any]) -> Dict[str, Any]:
+    """A ranking result with its donor as a plain row."""
+    return ranked if isinstance(ranked["donor"], dict) else {**ranked, "donor": donor_row(ranked["donor"])}
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+def _ndjson(rows: Iterable[Any]) -> Iterator[bytes]:
+    rows = iter(rows)
+    while chunk := list(islice(rows, NDJSON_CHUNK_ROWS)):
+        yield b"".join(dumps(row) + b"\n" for row in chunk)
+
+async def list_response(request: Request, rows: Iterable[Any], headers: Optional[Mapping[str, str]] = None) -> Response:
+    """`rows` (schema-shaped dicts) as a JSON array or, for a client sending `Accept: application/x-ndjson`, as
+    newline-delimited JSON streamed NDJSON_CHUNK_ROWS rows at a time.
+
+    `rows` may be lazy, e.g. a generator building each dict from a cached pool: when streaming, each chunk is
+    then built, encoded and sent before the next one is drawn, so only the source (and not its dicts or their
+    JSON) is held for the whole response. A JSON array is always built and encoded in full."""
+    if wants_ndjson(request): return StreamingResponse(_ndjson(rows), media_type=NDJSON_MEDIA_TYPE, headers=headers)  # iterated in the threadpool
+    with metrics.span("serialization"): body = await run_in_threadpool(lambda: dumps(list(rows)))
+    return Response(body, media_type="application/json", headers=headers)
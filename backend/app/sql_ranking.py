@@ -0,0 +1,96 @@
+# backend/app/sql_ranking.py
+"""Query-side ranker: eligibility, the weighted score and ORDER BY/LIMIT run in the database.
+
+Produces the same output as `ranking.rank_donors` over `ranking.calculate_features`, but only the
+returned rows are fetched, as plain
+columns in the shape of `schemas.Donor` rather than ORM objects. Works on PostgreSQL and SQLite (>= 3.25, for window functions).
+Distances use the same equirectangular formula as `geo`, which needs no trigonometry in SQL.
+"""
+import math
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Sequence
+from sqlalchemy import select, case, func, literal, and_, or_, Float, Integer, DateTime
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.ext.compiler import compiles
+try:
+    from . import geo, models
+    from .serialization import DONOR_FIELDS
+    from .ranking import WEIGHTS, MIN_DAYS_BETWEEN_DONATIONS, NEVER_DONATED_DAYS, Origin, explain_match
+except ImportError:
+    import sys
+    import os
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    import geo, models
+    from serialization import DONOR_FIELDS
+    from ranking import WEIGHTS, MIN_DAYS_BETWEEN_DONATIONS, NEVER_DONATED_DAYS, Origin, explain_match
+
+class days_between(FunctionElement):
+    """Whole days from the first timestamp to the second, floored like `timedelta.days` (SQLite truncates, which only differs for future dates)."""
+    type = Integer(); name = "days_between"; inherit_cache = True
+
+@compiles(days_between)
+def _days_between_default(element, compiler, **kw):
+    start, end = [compiler.process(c, **kw) for c in element.clauses]
+    return f"CAST(floor(EXTRACT(EPOCH FROM ({end} - {start})) / 86400) AS INTEGER)"
+
+@compiles(days_between, "sqlite")
+def _days_between_sqlite(element, compiler, **kw):
+    start, end = [compiler.process(c, **kw) for c in element.clauses]
+    return f"CAST(julianday({end}) - julianday({start}) AS INTEGER)"
+
+def _nan_if_none(value: Optional[float]) -> float:
+    return float("nan") if value is None else float(value)
+
+def location_terms(Donor, origin: Origin, radius_km: Optional[float] = None):
+    """(squared distance, proximity, radius filter) expressions mirroring `ranking.locate`; the radius filter
+    prefilters on an indexed `geo_cell` range and a longitude band before the exact distance check, and is
+    None without a radius."""
+    same_city = case((Donor.city == origin.city, 1.0), else_=0.0)
+    if not origin.located:
+        return literal(None, Float), same_city, (Donor.city == origin.city if radius_km is not None else None)
+    kx, ky = geo.km_per_degree(origin.latitude)
+    dx = (Donor.longitude - origin.longitude) * literal(kx, Float); dy = (Donor.latitude - origin.latitude) * literal(ky, Float)
+    squared = dx * dx + dy * dy
+    reach = geo.PROXIMITY_RADIUS_KM * geo.PROXIMITY_RADIUS_KM
+    proximity = case((Donor.latitude.is_(None) | Donor.longitude.is_(None), same_city), (squared >= reach, 0.0), else_=1 - squared / literal(reach, Float))
+    if radius_km is None: return squared, proximity, None
+    first_cell, last_cell, west, east = geo.cell_box(origin.latitude, origin.longitude, radius_km)
+    within = or_(
+        and_(Donor.geo_cell.between(first_cell, last_cell), Donor.longitude >= west, Donor.longitude < east, squared <= radius_km * radius_km),
+        and_(Donor.latitude.is_(None), Donor.city == origin.city),
+    )
+    return squared, proximity, within
+
+def ranked_query(hospital_id: int, hospital_location: str, compatible_types: List[str], limit: Optional[int] = None, now: Optional[datetime] = None, radius_km: Optional[float] = None):
+    """The ranking as one SELECT: the `schemas.Donor` fields, then probability, proximity and squared distance, best first."""
+    now = now or datetime.now()
+    Donor = models.Donor
+    now_param = literal(now, DateTime)
+    days = func.coalesce(days_between(Donor.last_donation_date, now_param), NEVER_DONATED_DAYS)
+    squared, proximity, within = location_terms(Donor, Origin.at(hospital_location), radius_km)
+    raw_score = ( Donor.reliability_score * literal(WEIGHTS['Reliability'], Float) + proximity * literal(WEIGHTS['Proximity'], Float) + Donor.fatigue_level * literal(WEIGHTS['Fatigue'], Float) + days * literal(WEIGHTS['Days Since Donation'], Float) )
+    score = case((raw_score < 0, 0.0), else_=raw_score)
+    conditions = [
+        Donor.hospital_id == hospital_id, Donor.blood_type.in_(compatible_types), Donor.status == models.DonorStatus.ACTIVE,
+        (Donor.last_donation_date.is_(None)) | (Donor.last_donation_date <= now - timedelta(days=MIN_DAYS_BETWEEN_DONATIONS)),
+    ]
+    if within is not None: conditions.append(within)
+    scored = select(
+        Donor, proximity.label("proximity"), squared.label("squared_km"), score.label("score"),
+        func.min(score).over().label("min_score"), func.max(score).over().label("max_score"),
+    ).where(*conditions).subquery("scored")
+    spread = scored.c.max_score - scored.c.min_score
+    probability = case((scored.c.max_score > scored.c.min_score, func.coalesce((scored.c.score - scored.c.min_score) / spread, 0.5)), else_=0.5)
+    query = select(*(scored.c[f] for f in DONOR_FIELDS), probability.label("probability"), scored.c.proximity, scored.c.squared_km).order_by(probability.desc(), scored.c.id)
+    if limit is not None: query = query.limit(limit)
+    return query
+
+def ranked_rows(rows: Sequence[Any]) -> List[Dict[str, Any]]:
+    """`ranked_query` rows as ranking results with explanations. Needs no session."""
+    ranked_results = []
+    for position, (*columns, probability_score, proximity_value, squared_km) in enumerate(rows):
+        row = dict(zip(DONOR_FIELDS, columns))
+        explanation_human, shap_factors = explain_match(_nan_if_none(row["reliability_score"]), float(proximity_value), _nan_if_none(row["fatigue_level"]), position + 1, math.sqrt(_nan_if_none(squared_km)))
+        ranked_results.append({ "donor": row, "probability_score": float(probability_score), "rank": position + 1, "explanation_human": explanation_human, "explanation_shap": shap_factors, })
+    return ranked_results
@@ -0,0 +1,49 @@
+# backend/gunicorn.conf.py
+"""Production server: `gunicorn app.main:app -c gunicorn.conf.py`.
+
+The app is imported once in the master (preload_app), so FastAPI, SQLAlchemy, NumPy and the
+model libraries (lightgbm/shap) are imported a single time and shared copy-on-write by the forked
+workers. The ranking model itself is built in each worker's startup hook (see `model_registry`).
+Schema migrations also run once in the master, before any worker starts, instead of in every
+worker's startup hook; set SCHEMA_CHECK_ON_STARTUP=false there to leave them to a separate deploy step
+(`python -m app.migrations`). Prometheus metrics are written to PROMETHEUS_MULTIPROC_DIR (a fresh
+directory by default) so `/metrics` on any worker reports all of them.
+"""
+import os
+import shutil
+import tempfile
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(min(4, (os.cpu_count() or 1) * 2))))
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+max_requests = int(os.getenv("MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "0"))
+accesslog = os.getenv("ACCESS_LOG", "-") or None
+
+_run_schema_check = os.getenv("SCHEMA_CHECK_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+# Workers never run the schema check themselves: the master does it below, or a deploy step does.
+os.environ["SCHEMA_CHECK_ON_STARTUP"] = "false"
+
+# Must be set before prometheus_client is imported by the preload.
+if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="prometheus-")
+else:
+    shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True); os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"])
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+def when_ready(server):
+    """Runs in the master after the preload and before the first fork."""
+    from app import main, model_registry, models, ranking
+    if _run_schema_check:
+        with main.startup_phase("schema-check"): models.create_db_tables()
+    with main.startup_phase("model-import"): model_registry.preload_imports(ranking.registry.path)
+    # Connections opened here must not be inherited by the workers.
+    models.engine.dispose()
+    server.log.info("Master startup timings: %s", main.startup_report())
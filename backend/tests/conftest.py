@@ -0,0 +1,41 @@
+# backend/tests/conftest.py
+"""A seeded SQLite database and a logged-in client shared by the whole test session."""
+import os
+import sys
+import tempfile
+from datetime import datetime
+import pytest
+
+# The app reads its settings at import time, so they are set before anything imports it.
+_tmpdir = tempfile.mkdtemp(prefix="donor-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'test.db')}"
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SEED_DONORS = 1000
+SEED_HOSPITALS = 5
+SEED_NOW = datetime(2026, 10, 1)
+
+@pytest.fixture(scope="session")
+def seeded_db():
+    from app import seed
+    seed.seed_database(SEED_DONORS, SEED_HOSPITALS, seed.DEFAULT_SEED, now=SEED_NOW)
+
+@pytest.fixture(scope="session")
+def client(seeded_db):
+    from fastapi.testclient import TestClient
+    from app.main import app
+    with TestClient(app) as client: yield client
+
+@pytest.fixture(scope="session")
+def auth_headers(client):
+    from app import seed
+    response = client.post("/token", data={"username": seed.YENEPOYA_EMAIL, "password": "yenepoya123"})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+@pytest.fixture
+def db(seeded_db):
+    from app import models
+    with models.SessionLocal() as db: yield db
@@ -0,0 +1,33 @@
+# backend/tests/test_allocation.py
+from types import SimpleNamespace
+from app import ranking
+
+LOCATION = "Mangalore, Karnataka"
+
+def donor(donor_id, blood_type, reliability):
+    origin = ranking.Origin.at(LOCATION)
+    return SimpleNamespace(id=donor_id, blood_type=blood_type, reliability_score=reliability, fatigue_level=0.0, last_donation_date=None, city=origin.city, latitude=origin.latitude, longitude=origin.longitude)
+
+def allocated_ids(allocations):
+    return [[r["donor"].id for r in donors] for donors in allocations]
+
+def test_no_donor_is_assigned_twice(client, auth_headers):
+    requests = [{"blood_type_needed": bt, "units": units} for bt, units in [("A+", 40), ("O+", 40), ("AB+", 200), ("O-", 5), ("B+", 40)]]
+    response = client.post("/dashboard/find-matches/batch", json={"requests": requests}, headers=auth_headers)
+    assert response.status_code == 200
+    ids = [d["donor"]["id"] for allocation in response.json() for d in allocation["donors"]]
+    assert ids and len(ids) == len(set(ids))
+    for allocation in response.json():
+        assert allocation["units_allocated"] == len(allocation["donors"]) <= allocation["units_requested"]
+        assert {d["donor"]["blood_type"] for d in allocation["donors"]} <= set(ranking.get_compatible_types(allocation["blood_type_needed"]))
+
+def test_o_negative_donor_is_kept_for_a_later_o_negative_request():
+    features = ranking.calculate_features([donor(1, "O-", 0.95), donor(2, "A+", 0.6)], LOCATION)
+    # Alone, the A+ request takes the better-scored universal donor...
+    assert allocated_ids(ranking.allocate_donors(features, [("A+", 1)])) == [[1]]
+    # ...but with an O- request outstanding, the exact-type donor serves A+ and the O- donor is kept for O-.
+    assert allocated_ids(ranking.allocate_donors(features, [("A+", 1), ("O-", 1)])) == [[2], [1]]
+
+def test_unfilled_units_stay_unfilled():
+    features = ranking.calculate_features([donor(1, "O-", 0.9), donor(2, "A+", 0.8), donor(3, "A+", 0.7)], LOCATION)
+    assert allocated_ids(ranking.allocate_donors(features, [("O-", 2), ("A+", 3)])) == [[1], [2, 3]]
@@ -0,0 +1,88 @@
+# backend/tests/test_donors.py
+import json
+import pytest
+from sqlalchemy import select
+from app import models, seed
+from app.routers import donors
+
+def own_donor_id(db, hospital_id, status):
+    return db.execute(select(models.Donor.id).where(models.Donor.hospital_id == hospital_id, models.Donor.status == status).order_by(models.Donor.id.desc()).limit(1)).scalar_one()
+
+@pytest.fixture
+def hospital_id(db):
+    return db.execute(select(models.Hospital.id).where(models.Hospital.email == seed.YENEPOYA_EMAIL)).scalar_one()
+
+def batch(client, headers, action, donor_ids):
+    response = client.post(f"/dashboard/donors/batch/{action}", json={"donor_ids": donor_ids}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_batch_reports_each_id(client, auth_headers, db, hospital_id):
+    pending = own_donor_id(db, hospital_id, models.DonorStatus.PENDING_APPROVAL)
+    active = own_donor_id(db, hospital_id, models.DonorStatus.ACTIVE)
+    foreign = db.execute(select(models.Donor.id).where(models.Donor.hospital_id != hospital_id).limit(1)).scalar_one()
+    result = batch(client, auth_headers, "approve", [pending, active, foreign, 10**9, pending])
+    assert result["updated"] == 1
+    assert [(r["donor_id"], r["ok"], r["status"], r["detail"]) for r in result["results"]] == [
+        (pending, True, "active", None),
+        (active, True, "active", None),  # already in the target status
+        (foreign, False, None, "Not authorized"),
+        (10**9, False, None, "Donor not found"),
+    ]
+    db.expire_all()
+    assert db.get(models.Donor, pending).status == models.DonorStatus.ACTIVE
+    assert db.get(models.Donor, foreign).hospital_id != hospital_id
+
+def test_batch_decline_is_idempotent(client, auth_headers, db, hospital_id):
+    active = own_donor_id(db, hospital_id, models.DonorStatus.ACTIVE)
+    assert batch(client, auth_headers, "decline", [active])["updated"] == 1
+    again = batch(client, auth_headers, "decline", [active])
+    assert again["updated"] == 0 and again["results"] == [{"donor_id": active, "ok": True, "status": "inactive", "detail": None}]
+
+def test_batch_stats_follow_the_update(client, auth_headers, db, hospital_id):
+    pending = db.execute(select(models.Donor.id).where(models.Donor.hospital_id == hospital_id, models.Donor.status == models.DonorStatus.PENDING_APPROVAL).limit(3)).scalars().all()
+    before = client.get("/hospitals/dashboard/stats", headers=auth_headers).json()
+    assert batch(client, auth_headers, "approve", pending)["updated"] == len(pending)
+    after = client.get("/hospitals/dashboard/stats", headers=auth_headers).json()
+    assert (after["active_donors"], after["pending_donors"]) == (before["active_donors"] + len(pending), before["pending_donors"] - len(pending))
+
+def test_unknown_batch_action_is_rejected(client, auth_headers):
+    assert client.post("/dashboard/donors/batch/delete", json={"donor_ids": [1]}, headers=auth_headers).status_code == 422
+
+def import_donors(client, headers, rows):
+    body = "".join(json.dumps(row) + "\n" for row in rows)
+    response = client.post("/dashboard/donors/import", content=body, headers={**headers, "Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def new_donor(n, **overrides):
+    return {"full_name": f"Import Donor {n}", "email": f"import.{n}@example.com", "phone": f"+91-777-{n:07d}", "blood_type": "B+", "location": "Udupi, Karnataka", **overrides}
+
+@pytest.mark.parametrize("chunk_rows", [1000, 2])
+def test_import_rejects_duplicate_email_and_phone(client, auth_headers, db, monkeypatch, chunk_rows):
+    monkeypatch.setattr(donors, "IMPORT_CHUNK_ROWS", chunk_rows)
+    existing = db.execute(select(models.Donor).limit(1)).scalar_one()
+    n = chunk_rows * 10
+    rows = [
+        new_donor(n + 1),
+        new_donor(n + 2, email=f"import.{n + 1}@example.com"),  # email used earlier in the body
+        new_donor(n + 3, phone=new_donor(n + 1)["phone"]),  # phone used earlier in the body
+        new_donor(n + 4, email=existing.email),  # email of an existing donor
+        new_donor(n + 5, phone=existing.phone),  # phone of an existing donor
+        new_donor(n + 6),
+    ]
+    result = import_donors(client, auth_headers, rows)
+    assert (result["created"], result["failed"]) == (2, 4)
+    assert [(r["line"], r["ok"], r["detail"]) for r in result["results"]] == [
+        (1, True, None), (2, False, "Email or phone already exists."), (3, False, "Email or phone already exists."),
+        (4, False, "Email or phone already exists."), (5, False, "Email or phone already exists."), (6, True, None),
+    ]
+    created = {r["donor_id"] for r in result["results"] if r["ok"]}
+    assert {d.email for d in db.execute(select(models.Donor).where(models.Donor.id.in_(created))).scalars()} == {rows[0]["email"], rows[5]["email"]}
+
+def test_import_reports_invalid_lines(client, auth_headers):
+    body = json.dumps(new_donor(90001)) + "\n{not json\n" + json.dumps(new_donor(90002, blood_type="Z+")) + "\n[1]\n"
+    response = client.post("/dashboard/donors/import", content=body, headers={**auth_headers, "Content-Type": "application/x-ndjson"})
+    results = response.json()["results"]
+    assert [(r["line"], r["ok"]) for r in results] == [(1, True), (2, False), (3, False), (4, False)]
+    assert results[1]["detail"].startswith("Invalid JSON") and results[2]["detail"].startswith("blood_type") and results[3]["detail"] == "Expected a JSON object"
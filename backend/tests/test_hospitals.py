@@ -0,0 +1,11 @@
+# backend/tests/test_hospitals.py
+from sqlalchemy import select
+from app import models, seed
+
+def test_stats_reflect_an_approval_immediately(client, auth_headers, db):
+    hospital_id = db.execute(select(models.Hospital.id).where(models.Hospital.email == seed.YENEPOYA_EMAIL)).scalar_one()
+    pending = db.execute(select(models.Donor.id).where(models.Donor.hospital_id == hospital_id, models.Donor.status == models.DonorStatus.PENDING_APPROVAL).limit(1)).scalar_one()
+    before = client.get("/hospitals/dashboard/stats", headers=auth_headers).json()
+    assert client.patch(f"/dashboard/donors/{pending}/approve", headers=auth_headers).status_code == 200
+    after = client.get("/hospitals/dashboard/stats", headers=auth_headers).json()
+    assert (after["active_donors"], after["pending_donors"], after["total_donors"]) == (before["active_donors"] + 1, before["pending_donors"] - 1, before["total_donors"])
@@ -0,0 +1,73 @@
+# backend/tests/test_ranking.py
+import pytest
+from sqlalchemy import select
+from app import geo, models, ranking, seed, sql_ranking
+from app.routers import donors
+from app.routers.auth import HospitalPrincipal
+
+BLOOD_TYPES = ["A+", "O-", "AB+"]
+RADII = [None, 10, 60, 400]
+
+def find_matches(client, headers, **request):
+    response = client.post("/dashboard/find-matches", json=request, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def active_compatible(db, blood_type):
+    Donor = models.Donor
+    query = select(Donor).where(Donor.status == models.DonorStatus.ACTIVE, Donor.blood_type.in_(ranking.get_compatible_types(blood_type))).order_by(Donor.hospital_id, Donor.id)
+    return list(db.execute(query).scalars())
+
+def yenepoya(db):
+    return db.execute(select(models.Hospital).where(models.Hospital.email == seed.YENEPOYA_EMAIL)).scalar_one()
+
+def assert_same_ranking(actual, expected, tolerance=1e-9):
+    assert [r["donor"]["id"] for r in actual] == [r["donor"]["id"] for r in expected]
+    for a, e in zip(actual, expected):
+        assert a["probability_score"] == pytest.approx(e["probability_score"], abs=tolerance)
+        assert a["explanation_human"] == e["explanation_human"]
+
+@pytest.mark.parametrize("radius_km", RADII)
+@pytest.mark.parametrize("blood_type", BLOOD_TYPES)
+def test_sql_engine_matches_python_engine(client, auth_headers, blood_type, radius_km):
+    python = find_matches(client, auth_headers, blood_type_needed=blood_type, engine="python", radius_km=radius_km)
+    sql = find_matches(client, auth_headers, blood_type_needed=blood_type, engine="sql", radius_km=radius_km)
+    if radius_km is None: assert python
+    assert_same_ranking(sql, python)
+
+def test_large_radius_prefilter_binds_few_parameters(db):
+    origin = ranking.Origin.at(yenepoya(db).location)
+    query = select(models.Donor.id).where(sql_ranking.location_terms(models.Donor, origin, 5000)[2])
+    assert len(query.compile().params) < 20
+    within = {d.id for d in db.execute(select(models.Donor)).scalars() if d.latitude is not None and geo.squared_distance_km(origin.latitude, origin.longitude, d.latitude, d.longitude) <= 5000 ** 2}
+    assert set(db.execute(query).scalars()) >= within
+
+def test_uncached_candidates_are_prefiltered_by_radius(db, monkeypatch):
+    monkeypatch.setattr(donors.donor_pools, "enabled", False)
+    hospital = yenepoya(db); origin = ranking.Origin.at(hospital.location)
+    compatible_types = ranking.get_compatible_types("O+")
+    everyone = donors._candidates(db, HospitalPrincipal.from_hospital(hospital), compatible_types)
+    nearby = donors._candidates(db, HospitalPrincipal.from_hospital(hospital), compatible_types, 60)
+    assert 0 < len(nearby) < len(everyone)
+    assert all(geo.squared_distance_km(origin.latitude, origin.longitude, d.latitude, d.longitude) <= 60 ** 2 for d in nearby)
+
+@pytest.mark.parametrize("limit", [1, 7, 50])
+def test_merge_shards_matches_single_pool(db, limit):
+    hospital = yenepoya(db)
+    donors = active_compatible(db, "O+")
+    model = ranking.registry.current()
+    shards = []
+    for hospital_id in sorted({d.hospital_id for d in donors}):
+        features = ranking.calculate_features([d for d in donors if d.hospital_id == hospital_id], hospital.location)
+        shards.append((features, ranking.raw_scores(features, model)))
+    merged = ranking.merge_shards(shards, limit, model=model)
+    single = ranking.rank_donors(ranking.calculate_features(donors, hospital.location), limit=limit, model=model)
+    assert [(r["donor"].id, r["probability_score"], r["explanation_human"]) for r in merged] == [(r["donor"].id, r["probability_score"], r["explanation_human"]) for r in single]
+
+@pytest.mark.parametrize("limit,radius_km", [(None, None), (10, None), (5, 60), (20, 400)])
+@pytest.mark.parametrize("blood_type", BLOOD_TYPES)
+def test_network_search_matches_single_pool(client, auth_headers, db, blood_type, limit, radius_km):
+    network = find_matches(client, auth_headers, blood_type_needed=blood_type, scope="network", limit=limit, radius_km=radius_km)
+    features = ranking.calculate_features(active_compatible(db, blood_type), yenepoya(db).location, radius_km)
+    expected = [{**r, "donor": {"id": r["donor"].id}} for r in ranking.rank_donors(features, limit=limit or 50)]
+    assert_same_ranking(network, expected, tolerance=1e-12)
@@ -0,0 +1,10 @@
+# backend/tests/test_seed.py
+from datetime import datetime
+import numpy as np
+from app import seed
+
+def test_same_seed_and_now_generate_the_same_donors():
+    now = datetime(2026, 10, 1, 12, 30)
+    first, second = [seed.generate_donors(np.random.default_rng(7), 0, 200, [1, 2, 3], seed.name_pools(7), now) for _ in range(2)]
+    assert first == second
+    assert set(first["updated_at"]) == {"2026-10-01 12:30:00.000000"}
@@ -0,0 +1,40 @@
+# backend/tests/test_serialization.py
+import json
+from typing import List
+import pytest
+from pydantic import TypeAdapter
+from app import schemas, serialization
+
+@pytest.mark.parametrize("request_body", [
+    {"blood_type_needed": "A+"},
+    {"blood_type_needed": "O-", "engine": "sql", "limit": 7},
+    {"blood_type_needed": "AB+", "radius_km": 60},
+    {"blood_type_needed": "O+", "scope": "network", "limit": 20},
+])
+def test_find_matches_body_matches_response_model(client, auth_headers, request_body):
+    response = client.post("/dashboard/find-matches", json=request_body, headers=auth_headers)
+    assert response.status_code == 200
+    adapter = TypeAdapter(List[schemas.RankedDonor])
+    assert response.content == adapter.dump_json(adapter.validate_json(response.content))
+
+@pytest.mark.parametrize("params", [{}, {"limit": 5}, {"status": "active", "blood_type": "A+"}])
+def test_donor_list_body_matches_response_model(client, auth_headers, params):
+    response = client.get("/dashboard/donors", params=params, headers=auth_headers)
+    assert response.status_code == 200
+    adapter = TypeAdapter(List[schemas.Donor])
+    assert response.content == adapter.dump_json(adapter.validate_json(response.content))
+
+def test_ndjson_streams_the_same_rows(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(serialization, "NDJSON_CHUNK_ROWS", 3)
+    body = {"blood_type_needed": "A+", "limit": 10}
+    array = client.post("/dashboard/find-matches", json=body, headers=auth_headers).json()
+    response = client.post("/dashboard/find-matches", json=body, headers={**auth_headers, "Accept": serialization.NDJSON_MEDIA_TYPE})
+    assert response.headers["content-type"].startswith(serialization.NDJSON_MEDIA_TYPE)
+    assert [json.loads(line) for line in response.text.splitlines()] == array
+
+@pytest.mark.parametrize("params", [{}, {"status": "active", "limit": 25}])
+def test_donor_list_ndjson_streams_the_same_rows(client, auth_headers, monkeypatch, params):
+    monkeypatch.setattr(serialization, "NDJSON_CHUNK_ROWS", 7)
+    array = client.get("/dashboard/donors", params=params, headers=auth_headers).json()
+    response = client.get("/dashboard/donors", params=params, headers={**auth_headers, "Accept": serialization.NDJSON_MEDIA_TYPE})
+    assert [json.loads(line) for line in response.text.splitlines()] == array
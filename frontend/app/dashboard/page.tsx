@@ -1,6 +1,6 @@
 'use client';
 
-import { useState, useEffect, useMemo } from 'react';
+import { useState, useEffect, useMemo, useRef } from 'react';
 import { useRouter } from 'next/navigation';
 import {
   useReactTable,
@@ -98,6 +98,13 @@ const getStatusColor = (status: string) => {
   }
 };
 
+// Largest updated_at seen; used as the `updated_since` watermark for delta syncs
+const latestUpdate = (donors: Donor[], current: string | null): string | null =>
+  donors.reduce<string | null>(
+    (latest, donor) => (donor.updated_at && (!latest || donor.updated_at > latest) ? donor.updated_at : latest),
+    current
+  );
+
 // Column helper for react-table
 const columnHelper = createColumnHelper<Donor>();
 
@@ -112,6 +119,7 @@ export default function DashboardPage() {
   const [searchError, setSearchError] = useState<string | null>(null);
   const [sorting, setSorting] = useState<SortingState>([]);
   const [columnFilters, setColumnFilters] = useState<ColumnFiltersState>([]);
+  const lastSyncRef = useRef<string | null>(null);
 
   // Auth and router
   const isAuthenticated = useAuthStore((state) => state.isAuthenticated);
@@ -269,15 +277,36 @@ export default function DashboardPage() {
   }, [isAuthenticated, router]);
 
   // Functions
+  // Replaces changed donors in place and appends new ones
+  const mergeDonors = (changed: Donor[]) => {
+    setAllDonors((prev) => {
+      const byId = new Map(prev.map((donor) => [donor.id, donor]));
+      changed.forEach((donor) => byId.set(donor.id, donor));
+      return Array.from(byId.values());
+    });
+  };
+
+  const refreshStats = async () => {
+    const statsRes = await api.get('/hospitals/dashboard/stats');
+    setStats(statsRes.data);
+  };
+
+  // First load pulls the full list; later refreshes only pull donors changed since the last sync
   const fetchData = async () => {
     setIsLoading(true);
     try {
+      const since = lastSyncRef.current;
       const [statsRes, donorsRes] = await Promise.all([
         api.get('/hospitals/dashboard/stats'),
-        api.get('/dashboard/donors'),
+        api.get('/dashboard/donors', since ? { params: { updated_since: since } } : undefined),
       ]);
       setStats(statsRes.data);
-      setAllDonors(donorsRes.data);
+      if (since) {
+        mergeDonors(donorsRes.data);
+      } else {
+        setAllDonors(donorsRes.data);
+      }
+      lastSyncRef.current = latestUpdate(donorsRes.data, since);
     } catch (error) {
       console.error('Failed to fetch data:', error);
       toast.error('Failed to load dashboard data');
@@ -310,9 +339,10 @@ export default function DashboardPage() {
 
   const handleApprove = async (donorId: number) => {
     try {
-      await api.patch(`/dashboard/donors/${donorId}/approve`);
+      const response = await api.patch(`/dashboard/donors/${donorId}/approve`);
       toast.success('Donor approved successfully');
-      fetchData();
+      mergeDonors([response.data]);
+      refreshStats();
     } catch (error) {
       console.error('Failed to approve donor:', error);
       toast.error('Failed to approve donor');
@@ -321,9 +351,10 @@ export default function DashboardPage() {
 
   const handleDecline = async (donorId: number) => {
     try {
-      await api.patch(`/dashboard/donors/${donorId}/decline`);
+      const response = await api.patch(`/dashboard/donors/${donorId}/decline`);
       toast.success('Donor declined successfully');
-      fetchData();
+      mergeDonors([response.data]);
+      refreshStats();
     } catch (error) {
       console.error('Failed to decline donor:', error);
       toast.error('Failed to decline donor');
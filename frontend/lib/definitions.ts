@@ -20,6 +20,7 @@ export interface Donor {
   reliability_score: number;
   last_donation_date?: string | null;
   fatigue_level: number;
+  updated_at?: string | null;
 }
 
 // Ranked Donor Information (Matches backend schema)